@@ -0,0 +1,33 @@
+"""Индексы для постраничного списка вопросов
+
+Revision ID: 0b5e8d21f7a4
+Revises: f2b7c90d4e16
+Create Date: 2026-10-18 15:48:09.630221
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5e8d21f7a4'
+down_revision = 'f2b7c90d4e16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_questions_created_at_question_id', 'questions', ['created_at', 'question_id'], unique=False,
+    )
+    op.create_index(
+        'ix_questions_category_type_created_at', 'questions',
+        ['category_id', 'type_select_id', 'created_at', 'question_id'], unique=False,
+    )
+    op.create_index(op.f('ix_answers_question_id'), 'answers', ['question_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_answers_question_id'), table_name='answers')
+    op.drop_index('ix_questions_category_type_created_at', table_name='questions')
+    op.drop_index('ix_questions_created_at_question_id', table_name='questions')
@@ -0,0 +1,49 @@
+"""Индексы для постраничного вывода и фильтрации пользователей
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_users_created_at_user_id', 'users', ['created_at', 'user_id'], unique=False)
+    op.create_index(
+        'ix_users_active_created_at_user_id', 'users', ['created_at', 'user_id'],
+        unique=False, postgresql_where=sa.text('is_active'),
+    )
+    op.create_index('ix_users_job_title', 'users', ['job_title'], unique=False)
+    op.create_index('ix_users_roles', 'users', [sa.text('(roles::jsonb)')], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_users_name_trgm', 'users', ['name'],
+        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_users_surname_trgm', 'users', ['surname'],
+        unique=False, postgresql_using='gin', postgresql_ops={'surname': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_users_email_trgm', 'users', ['email'],
+        unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    op.drop_index('ix_users_surname_trgm', table_name='users')
+    op.drop_index('ix_users_name_trgm', table_name='users')
+    op.drop_index('ix_users_roles', table_name='users')
+    op.drop_index('ix_users_job_title', table_name='users')
+    op.drop_index('ix_users_active_created_at_user_id', table_name='users')
+    op.drop_index('ix_users_created_at_user_id', table_name='users')
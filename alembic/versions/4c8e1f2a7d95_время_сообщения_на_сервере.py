@@ -0,0 +1,28 @@
+"""Время сообщения на сервере
+
+Revision ID: 4c8e1f2a7d95
+Revises: d7a2c5e9f318
+Create Date: 2026-10-18 19:48:21.604517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e1f2a7d95'
+down_revision = 'd7a2c5e9f318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'messages', 'created_at',
+        existing_type=sa.DateTime(),
+        server_default=sa.text("timezone('utc', clock_timestamp())"),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column('messages', 'created_at', existing_type=sa.DateTime(), server_default=None)
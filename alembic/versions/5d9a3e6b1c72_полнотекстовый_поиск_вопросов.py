@@ -0,0 +1,45 @@
+"""Полнотекстовый поиск по вопросам и ответам
+
+Revision ID: 5d9a3e6b1c72
+Revises: 0b5e8d21f7a4
+Create Date: 2026-10-18 16:31:54.097413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a3e6b1c72'
+down_revision = '0b5e8d21f7a4'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = "to_tsvector('russian', coalesce({column}, '')) || to_tsvector('simple', coalesce({column}, ''))"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('questions', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL.format(column='title'), persisted=True), nullable=True,
+    ))
+    op.add_column('answers', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL.format(column='text'), persisted=True), nullable=True,
+    ))
+    op.create_index('ix_questions_search_vector', 'questions', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_answers_search_vector', 'answers', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_questions_title_trgm', 'questions', ['title'],
+        unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_questions_title_trgm', table_name='questions')
+    op.drop_index('ix_answers_search_vector', table_name='answers')
+    op.drop_index('ix_questions_search_vector', table_name='questions')
+    op.drop_column('answers', 'search_vector')
+    op.drop_column('questions', 'search_vector')
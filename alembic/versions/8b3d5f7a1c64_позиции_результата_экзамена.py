@@ -0,0 +1,27 @@
+"""Позиции результата экзамена
+
+Revision ID: 8b3d5f7a1c64
+Revises: 4c8e1f2a7d95
+Create Date: 2026-10-18 20:31:07.215843
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3d5f7a1c64'
+down_revision = '4c8e1f2a7d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('exam_results', sa.Column('positions', sa.SmallInteger(), nullable=True))
+    # До этой ревизии total совпадал с числом позиций билета
+    op.execute("UPDATE exam_results SET positions = total")
+    op.alter_column('exam_results', 'positions', existing_type=sa.SmallInteger(), nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('exam_results', 'positions')
@@ -0,0 +1,27 @@
+"""Индекс истории сообщений чата
+
+Revision ID: 8e2c4f7a9b31
+Revises: 5d9a3e6b1c72
+Create Date: 2026-10-18 17:12:27.583019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2c4f7a9b31'
+down_revision = '5d9a3e6b1c72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_messages_chat_id_created_at', 'messages',
+        ['chat_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_chat_id_created_at', table_name='messages')
@@ -0,0 +1,32 @@
+"""Индексы истории действий пользователей
+
+Revision ID: a7d54e19c2f3
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 11:40:05.772913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d54e19c2f3'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_user_action_history_user_id_timestamp', 'user_action_history',
+        ['user_id', sa.text('timestamp DESC')], unique=False,
+    )
+    op.create_index(
+        'ix_user_action_history_timestamp_id', 'user_action_history',
+        [sa.text('timestamp DESC'), sa.text('id DESC')], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_action_history_timestamp_id', table_name='user_action_history')
+    op.drop_index('ix_user_action_history_user_id_timestamp', table_name='user_action_history')
@@ -0,0 +1,26 @@
+"""Контрольные суммы загруженных файлов
+
+Revision ID: b3f6d18e4a57
+Revises: 8e2c4f7a9b31
+Create Date: 2026-10-18 17:46:03.915264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f6d18e4a57'
+down_revision = '8e2c4f7a9b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('file_sha256', sa.String(length=64), nullable=True))
+    op.add_column('users', sa.Column('avatar_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'avatar_sha256')
+    op.drop_column('messages', 'file_sha256')
@@ -0,0 +1,51 @@
+"""Билеты экзамена
+
+Revision ID: c4e8b2f61a9d
+Revises: a7d54e19c2f3
+Create Date: 2026-10-18 13:05:41.208347
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8b2f61a9d'
+down_revision = 'a7d54e19c2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exam_tickets',
+        sa.Column('ticket_id', postgresql.UUID(), nullable=False),
+        sa.Column('user_id', postgresql.UUID(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('type_select_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['type_select_id'], ['type_selections.id'], ),
+        sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index(op.f('ix_exam_tickets_user_id'), 'exam_tickets', ['user_id'], unique=False)
+    op.create_table(
+        'exam_ticket_questions',
+        sa.Column('ticket_id', postgresql.UUID(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('question_id', postgresql.UUID(), nullable=True),
+        sa.Column('answer_order', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(['ticket_id'], ['exam_tickets.ticket_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.question_id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('ticket_id', 'position')
+    )
+    op.create_index(
+        op.f('ix_exam_ticket_questions_question_id'), 'exam_ticket_questions', ['question_id'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_exam_ticket_questions_question_id'), table_name='exam_ticket_questions')
+    op.drop_table('exam_ticket_questions')
+    op.drop_index(op.f('ix_exam_tickets_user_id'), table_name='exam_tickets')
+    op.drop_table('exam_tickets')
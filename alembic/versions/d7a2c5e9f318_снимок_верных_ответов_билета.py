@@ -0,0 +1,28 @@
+"""Снимок верных ответов билета
+
+Revision ID: d7a2c5e9f318
+Revises: b3f6d18e4a57
+Create Date: 2026-10-18 19:12:40.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a2c5e9f318'
+down_revision = 'b3f6d18e4a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'exam_ticket_questions',
+        sa.Column('correct_answers', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('exam_ticket_questions', 'correct_answers')
@@ -0,0 +1,48 @@
+"""Результаты экзамена
+
+Revision ID: e91d3a7c5b28
+Revises: c4e8b2f61a9d
+Create Date: 2026-10-18 14:20:12.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e91d3a7c5b28'
+down_revision = 'c4e8b2f61a9d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exam_results',
+        sa.Column('ticket_id', postgresql.UUID(), nullable=False),
+        sa.Column('user_id', postgresql.UUID(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('type_select_id', sa.Integer(), nullable=True),
+        sa.Column('total', sa.SmallInteger(), nullable=False),
+        sa.Column('correct_count', sa.SmallInteger(), nullable=False),
+        sa.Column('score_percent', sa.Float(), nullable=False),
+        sa.Column('passed', sa.Boolean(), nullable=False),
+        sa.Column('correct_bitmap', sa.LargeBinary(), nullable=False),
+        sa.Column('selected', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('submitted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['ticket_id'], ['exam_tickets.ticket_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['type_select_id'], ['type_selections.id'], ),
+        sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index('ix_exam_results_user_id_submitted_at', 'exam_results', ['user_id', 'submitted_at'], unique=False)
+    op.create_index(
+        'ix_exam_results_category_submitted_at', 'exam_results',
+        ['category_id', 'type_select_id', 'submitted_at'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exam_results_category_submitted_at', table_name='exam_results')
+    op.drop_index('ix_exam_results_user_id_submitted_at', table_name='exam_results')
+    op.drop_table('exam_results')
@@ -0,0 +1,58 @@
+"""Статистика экзамена
+
+Revision ID: f2b7c90d4e16
+Revises: e91d3a7c5b28
+Create Date: 2026-10-18 15:02:37.114806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7c90d4e16'
+down_revision = 'e91d3a7c5b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exam_question_stats',
+        sa.Column('question_id', postgresql.UUID(), nullable=False),
+        sa.Column('attempts', sa.BigInteger(), nullable=False),
+        sa.Column('correct', sa.BigInteger(), nullable=False),
+        sa.Column('sum_score', sa.Float(), nullable=False),
+        sa.Column('sum_score_sq', sa.Float(), nullable=False),
+        sa.Column('sum_score_correct', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.question_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('question_id')
+    )
+    op.create_table(
+        'exam_answer_stats',
+        sa.Column('answer_id', postgresql.UUID(), nullable=False),
+        sa.Column('question_id', postgresql.UUID(), nullable=False),
+        sa.Column('selected', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['answer_id'], ['answers.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.question_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('answer_id')
+    )
+    op.create_index(op.f('ix_exam_answer_stats_question_id'), 'exam_answer_stats', ['question_id'], unique=False)
+    op.create_table(
+        'exam_category_stats',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('type_select_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.BigInteger(), nullable=False),
+        sa.Column('passed', sa.BigInteger(), nullable=False),
+        sa.Column('sum_score', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('category_id', 'type_select_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('exam_category_stats')
+    op.drop_index(op.f('ix_exam_answer_stats_question_id'), table_name='exam_answer_stats')
+    op.drop_table('exam_answer_stats')
+    op.drop_table('exam_question_stats')
@@ -0,0 +1,52 @@
+import logging
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.types import Backend
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+
+async def init_cache() -> None:
+    """
+    Настраивает общий бэкенд кэша: Redis, если задан REDIS_URL, иначе
+    InMemoryBackend в памяти процесса.
+    """
+    global _redis
+    if settings.REDIS_URL:
+        from fastapi_cache.backends.redis import RedisBackend
+        from redis import asyncio as aioredis
+
+        _redis = aioredis.from_url(settings.REDIS_URL)
+        FastAPICache.init(RedisBackend(_redis), prefix=settings.CACHE_PREFIX)
+        logger.info("Cache backend: redis")
+    else:
+        FastAPICache.init(InMemoryBackend(), prefix=settings.CACHE_PREFIX)
+        # Версии ресурсов не общие между воркерами (см. ResourceVersions)
+        logger.info("Cache backend: in-memory (single worker only, set REDIS_URL for several)")
+
+
+async def close_cache() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.close()
+        _redis = None
+    FastAPICache.reset()
+
+
+def get_cache_backend() -> Backend:
+    """
+    Возвращает бэкенд кэша. Если init_cache не вызывался (например, приложение
+    поднято без lifespan), используется кэш в памяти процесса.
+    """
+    if FastAPICache._backend is None:
+        FastAPICache.init(InMemoryBackend(), prefix=settings.CACHE_PREFIX)
+    return FastAPICache.get_backend()
+
+
+def cache_key(*parts) -> str:
+    return ":".join([FastAPICache._prefix or settings.CACHE_PREFIX, *map(str, parts)])
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from backend.cache.versions import resource_versions
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ConditionalGet:
+    """
+    Зависимость для условных GET по версиям ресурсов (см. versions.py).
+
+    ETag строится из токенов версий, поэтому на If-None-Match с актуальным
+    ETag сразу отвечаем 304 - до загрузки и сериализации строк. Иначе ETag и
+    Cache-Control выставляются в ответ эндпоинта. Зависимость возвращает
+    прочитанные версии (resource -> токен), их можно передать дальше, чтобы
+    не читать повторно.
+
+        regions_etag = ConditionalGet(REGIONS, cache_control="private, no-cache")
+
+        @router.get("/all/")
+        async def read_regions(versions: dict = Depends(regions_etag)): ...
+    """
+
+    def __init__(self, *resources: str, cache_control: str):
+        self.resources = resources
+        self.cache_control = cache_control
+
+    async def __call__(self, request: Request, response: Response) -> dict:
+        versions = {resource: await resource_versions.get(resource) for resource in self.resources}
+        etag = '"{}"'.format("-".join(versions[resource] for resource in self.resources))
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return versions
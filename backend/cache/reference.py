@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import Counter
+
+from backend.cache.backend import cache_key, get_cache_backend
+from backend.cache.lru import TTLLRUCache
+from backend.cache.versions import resource_versions
+from backend.cache.versions import REGIONS, DEPARTMENTS, CATEGORIES, TYPE_SELECTIONS  # noqa: F401
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_REQUESTS = Counter(
+    "reference_cache_requests_total",
+    "Reference data lookups by resource and the level that served them",
+    ["resource", "level"],
+)
+
+
+class ReferenceCache:
+    """
+    Кэш справочников (регионы, департаменты, категории, типы выборки).
+
+    Справочник целиком хранится одной записью в общем бэкенде кэша (Redis или
+    память процесса), перед ним - короткоживущий L1 в памяти процесса.
+    Записи привязаны к версии ресурса (см. versions.py): invalidate, вызываемый
+    из CRUD-функций после коммита, меняет версию, и старые записи перестают
+    использоваться во всех процессах сразу. Выборки вроде "только активные"
+    фильтруются из полного списка.
+
+    Ошибки Redis не ломают запрос: справочник читается из базы.
+    """
+
+    def __init__(self, l1_ttl: float, l1_size: int):
+        self._l1 = TTLLRUCache(maxsize=l1_size, ttl=l1_ttl)
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    @staticmethod
+    def _key(resource: str, version: str) -> str:
+        return cache_key("reference", resource, version)
+
+    async def get_or_load(
+            self,
+            resource: str,
+            loader: Callable[[], Awaitable[List[Any]]],
+            ttl: int,
+            version: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Возвращает справочник resource в виде списка словарей. При промахе
+        справочник загружается через loader (один запрос на процесс, даже если
+        промахнулись несколько запросов одновременно).
+
+        version - уже прочитанная версия ресурса (например, при проверке ETag);
+        если не передана, читается из общего бэкенда.
+        """
+        if version is None:
+            version = await resource_versions.get(resource)
+
+        rows = self._l1_get(resource, version)
+        if rows is not None:
+            return rows
+
+        async with self._locks[resource]:
+            rows = self._l1_get(resource, version)
+            if rows is not None:
+                return rows
+
+            rows = await self._backend_get(resource, version)
+            if rows is not None:
+                REFERENCE_CACHE_REQUESTS.labels(resource, "shared").inc()
+            else:
+                REFERENCE_CACHE_REQUESTS.labels(resource, "database").inc()
+                # Если справочник изменят во время чтения, запись останется под
+                # старой версией, которую уже никто не запросит
+                rows = jsonable_encoder(await loader())
+                await self._backend_set(resource, version, rows, ttl)
+            self._l1.set(resource, (version, rows))
+            return rows
+
+    async def invalidate(self, resource: str) -> None:
+        self._l1.pop(resource)
+        await resource_versions.bump(resource)
+
+    def _l1_get(self, resource: str, version: str) -> Optional[List[dict]]:
+        entry = self._l1.get(resource)
+        if entry is None or entry[0] != version:
+            return None
+        REFERENCE_CACHE_REQUESTS.labels(resource, "l1").inc()
+        return entry[1]
+
+    async def _backend_get(self, resource: str, version: str):
+        try:
+            data = await get_cache_backend().get(self._key(resource, version))
+        except Exception as e:
+            logger.warning(f"Reference cache read failed for {resource}: {e}")
+            return None
+        return None if data is None else json.loads(data)
+
+    async def _backend_set(self, resource: str, version: str, rows: List[dict], ttl: int) -> None:
+        try:
+            await get_cache_backend().set(self._key(resource, version), json.dumps(rows).encode(), expire=ttl)
+        except Exception as e:
+            logger.warning(f"Reference cache write failed for {resource}: {e}")
+
+
+reference_cache = ReferenceCache(
+    l1_ttl=settings.REFERENCE_CACHE_L1_TTL,
+    l1_size=settings.REFERENCE_CACHE_L1_SIZE,
+)
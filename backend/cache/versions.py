@@ -0,0 +1,70 @@
+import logging
+import uuid
+
+from typing import Dict
+
+from backend.cache.backend import cache_key, get_cache_backend
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+REGIONS = "regions"
+DEPARTMENTS = "departments"
+CATEGORIES = "categories"
+TYPE_SELECTIONS = "type_selections"
+QUESTIONS = "questions"
+CHATS = "chats"
+
+
+class ResourceVersions:
+    """
+    Токены версий ресурсов в общем бэкенде кэша. CRUD-функции вызывают bump
+    после каждого изменения, поэтому совпадение токена означает, что данные
+    ресурса не менялись, и его можно проверять без обращения к самим строкам.
+
+    Токен - случайная строка, а не счётчик: после очистки Redis новый токен
+    не совпадёт со старыми ETag у клиентов.
+
+    Без REDIS_URL токены хранятся в словаре процесса без срока жизни: ETag и
+    кэши, зависящие от версии (пул вопросов, ключи ответов), меняются только
+    при изменении данных. Ограничение этого режима - один воркер: bump в
+    одном процессе другие не видят и продолжают отдавать прежние данные (и
+    304 на прежний ETag). Приложение с несколькими воркерами должно
+    работать с REDIS_URL.
+    """
+
+    def __init__(self):
+        self._local: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(resource: str) -> str:
+        return cache_key("version", resource)
+
+    async def get(self, resource: str) -> str:
+        if not settings.REDIS_URL:
+            token = self._local.get(resource)
+            return token if token is not None else await self.bump(resource)
+        try:
+            token = await get_cache_backend().get(self._key(resource))
+        except Exception as e:
+            logger.warning(f"Failed to read version of {resource}: {e}")
+            # Без общего хранилища версия неизвестна: отдаём уникальный токен,
+            # чтобы ни один ETag не совпал
+            return uuid.uuid4().hex
+        if token is None:
+            return await self.bump(resource)
+        return token.decode()
+
+    async def bump(self, resource: str) -> str:
+        token = uuid.uuid4().hex
+        if not settings.REDIS_URL:
+            self._local[resource] = token
+            return token
+        try:
+            await get_cache_backend().set(self._key(resource), token.encode(), expire=settings.RESOURCE_VERSION_TTL)
+        except Exception as e:
+            logger.error(f"Failed to bump version of {resource}: {e}")
+        return token
+
+
+resource_versions = ResourceVersions()
@@ -8,7 +8,8 @@ load_dotenv(dotenv_path=env_path)
 
 BASE_DIR = Path(__file__).parent.parent
 UPLOAD_DIR = "media/file"
-STATIC_FILES_DIR = BASE_DIR / "static"
+# Каталог static в корне проекта - туда же пишут загрузки (пути "static/...")
+STATIC_FILES_DIR = Path(os.getenv("STATIC_FILES_DIR", default=BASE_DIR.parent / "static"))
 
 
 class Settings:
@@ -38,4 +39,118 @@ ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES",
 REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", default=60))
 
 
-SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
\ No newline at end of file
+SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
+
+
+def _getenv_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+DB_ECHO: bool = _getenv_bool("DB_ECHO", default=False)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", default=10))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", default=20))
+DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", default=30))
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", default=1800))
+DB_POOL_PRE_PING: bool = _getenv_bool("DB_POOL_PRE_PING", default=True)
+DB_STATEMENT_TIMEOUT: int = int(os.getenv("DB_STATEMENT_TIMEOUT", default=0))  # мс, 0 - без ограничения
+DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", default=100))
+
+
+FACE_MODEL_NAME: str = os.getenv("FACE_MODEL_NAME", default="Facenet")
+FACE_DISTANCE_THRESHOLD: float = float(os.getenv("FACE_DISTANCE_THRESHOLD", default=0.40))
+FACE_INDEX_DIR: str = os.getenv("FACE_INDEX_DIR", default="data/face-index")
+FACE_WORKERS: int = int(os.getenv("FACE_WORKERS", default=2))
+FACE_MAX_QUEUE: int = int(os.getenv("FACE_MAX_QUEUE", default=16))
+FACE_TOP_K: int = int(os.getenv("FACE_TOP_K", default=5))
+
+
+TOKEN_CACHE_TTL: int = int(os.getenv("TOKEN_CACHE_TTL", default=60))
+TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", default=10000))
+
+
+BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", default=12))
+PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", default=4))
+
+
+PAGE_SIZE_DEFAULT: int = int(os.getenv("PAGE_SIZE_DEFAULT", default=50))
+PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", default=500))
+
+
+# batched - история действий пишется пачками в фоне после коммита изменения;
+# outbox - запись истории добавляется в ту же транзакцию, что и изменение.
+AUDIT_LOG_MODE: str = os.getenv("AUDIT_LOG_MODE", default="batched")
+AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", default=200))
+AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", default=1.0))
+AUDIT_QUEUE_SIZE: int = int(os.getenv("AUDIT_QUEUE_SIZE", default=10000))
+
+
+# Без REDIS_URL кэш и версии ресурсов хранятся в памяти процесса - только
+# для одного воркера: с несколькими воркерами REDIS_URL обязателен
+REDIS_URL: str = os.getenv("REDIS_URL")
+CACHE_PREFIX: str = os.getenv("CACHE_PREFIX", default="fastapi-cache")
+REFERENCE_CACHE_L1_TTL: float = float(os.getenv("REFERENCE_CACHE_L1_TTL", default=5))
+REFERENCE_CACHE_L1_SIZE: int = int(os.getenv("REFERENCE_CACHE_L1_SIZE", default=64))
+REGIONS_CACHE_TTL: int = int(os.getenv("REGIONS_CACHE_TTL", default=3600))
+DEPARTMENTS_CACHE_TTL: int = int(os.getenv("DEPARTMENTS_CACHE_TTL", default=3600))
+CATEGORIES_CACHE_TTL: int = int(os.getenv("CATEGORIES_CACHE_TTL", default=3600))
+TYPE_SELECTIONS_CACHE_TTL: int = int(os.getenv("TYPE_SELECTIONS_CACHE_TTL", default=3600))
+RESOURCE_VERSION_TTL: int = int(os.getenv("RESOURCE_VERSION_TTL", default=30 * 24 * 3600))
+
+# Cache-Control для списков с ETag: клиент хранит ответ, но перепроверяет его
+# через If-None-Match перед каждым использованием
+REFERENCE_CACHE_CONTROL: str = os.getenv("REFERENCE_CACHE_CONTROL", default="private, no-cache")
+QUESTIONS_CACHE_CONTROL: str = os.getenv("QUESTIONS_CACHE_CONTROL", default="private, no-cache")
+CHATS_CACHE_CONTROL: str = os.getenv("CHATS_CACHE_CONTROL", default="private, no-cache")
+
+QUESTION_IMPORT_MAX_ROWS: int = int(os.getenv("QUESTION_IMPORT_MAX_ROWS", default=10000))
+QUESTION_IMPORT_CHUNK_SIZE: int = int(os.getenv("QUESTION_IMPORT_CHUNK_SIZE", default=1000))
+
+EXAM_TICKET_SIZE: int = int(os.getenv("EXAM_TICKET_SIZE", default=20))
+EXAM_TICKET_MAX_SIZE: int = int(os.getenv("EXAM_TICKET_MAX_SIZE", default=100))
+EXAM_PASS_PERCENT: float = float(os.getenv("EXAM_PASS_PERCENT", default=90))
+EXAM_BULK_GRADE_MAX: int = int(os.getenv("EXAM_BULK_GRADE_MAX", default=500))
+
+QUESTION_SEARCH_LIMIT: int = int(os.getenv("QUESTION_SEARCH_LIMIT", default=50))
+# Порог сходства pg_trgm (0..1), с которого вопрос считается похожим на новый
+QUESTION_DUPLICATE_THRESHOLD: float = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", default=0.6))
+
+# Исходящая очередь websocket-подключения чата: при переполнении
+# (клиент не успевает читать) подключение закрывается
+CHAT_OUTBOUND_QUEUE_SIZE: int = int(os.getenv("CHAT_OUTBOUND_QUEUE_SIZE", default=100))
+CHAT_SEND_TIMEOUT: float = float(os.getenv("CHAT_SEND_TIMEOUT", default=10))
+
+# memory | redis; по умолчанию redis, если задан REDIS_URL
+CHAT_BROKER: str = os.getenv("CHAT_BROKER")
+CHAT_BROKER_BATCH_SIZE: int = int(os.getenv("CHAT_BROKER_BATCH_SIZE", default=100))
+CHAT_BROKER_FLUSH_INTERVAL: float = float(os.getenv("CHAT_BROKER_FLUSH_INTERVAL", default=0.01))
+CHAT_BROKER_QUEUE_SIZE: int = int(os.getenv("CHAT_BROKER_QUEUE_SIZE", default=10000))
+CHAT_BROKER_PUBLISH_RETRIES: int = int(os.getenv("CHAT_BROKER_PUBLISH_RETRIES", default=3))
+CHAT_BROKER_RECONNECT_MAX_DELAY: float = float(os.getenv("CHAT_BROKER_RECONNECT_MAX_DELAY", default=30))
+
+# Сообщения, полученные по websocket, пишутся в базу пачками
+CHAT_MESSAGE_BATCH_SIZE: int = int(os.getenv("CHAT_MESSAGE_BATCH_SIZE", default=200))
+CHAT_MESSAGE_FLUSH_INTERVAL: float = float(os.getenv("CHAT_MESSAGE_FLUSH_INTERVAL", default=0.05))
+# Сколько сообщений может ждать записи; сверх этого отправитель получает ошибку
+CHAT_MESSAGE_QUEUE_SIZE: int = int(os.getenv("CHAT_MESSAGE_QUEUE_SIZE", default=5000))
+
+# Загруженные файлы хранятся по sha256 содержимого (backend/storage/uploads.py)
+UPLOADS_DIR: str = os.getenv("UPLOADS_DIR", default="static/uploads")
+# Недописанные загрузки - вне STATIC_FILES_DIR, чтобы их нельзя было скачать
+UPLOADS_TMP_DIR: str = os.getenv("UPLOADS_TMP_DIR", default="data/uploads-tmp")
+UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", default=1024 * 1024))
+AVATAR_MAX_SIZE: int = int(os.getenv("AVATAR_MAX_SIZE", default=5 * 1024 * 1024))
+CHAT_ATTACHMENT_MAX_SIZE: int = int(os.getenv("CHAT_ATTACHMENT_MAX_SIZE", default=50 * 1024 * 1024))
+
+# Миниатюры аватаров: квадраты указанных размеров в WebP и JPEG
+AVATAR_THUMBNAIL_SIZES: tuple = tuple(
+    int(size) for size in os.getenv("AVATAR_THUMBNAIL_SIZES", default="64,256").split(",") if size.strip()
+)
+THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS", default=2))
+# Для адресов, зависящих от содержимого файла
+IMMUTABLE_CACHE_CONTROL: str = os.getenv("IMMUTABLE_CACHE_CONTROL", default="public, max-age=31536000, immutable")
+
+STATIC_URL: str = "/static"
+STATIC_CACHE_CONTROL: str = os.getenv("STATIC_CACHE_CONTROL", default="public, no-cache")
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatchWriterFull(Exception):
+    """Очередь записи переполнена: хранилище не успевает за потоком элементов."""
+
+
+class BatchWriterStopped(Exception):
+    """Писатель остановлен, новые элементы не принимаются."""
+
+
+class BatchWriter:
+    """
+    Фоновая запись пачками: элементы копятся в очереди процесса и передаются
+    в flush, как только набралось max_batch_size элементов или прошло
+    flush_interval секунд с первого элемента пачки.
+
+    Очередь ограничена max_queue_size элементами (0 - без ограничения): если
+    хранилище не успевает, submit_nowait сразу отказывает (BatchWriterFull),
+    а не копит элементы в памяти. Ошибка записи пачки логируется и не доходит
+    до кода, поставившего элемент в очередь. stop() дожидается записи всего,
+    что уже было в очереди; после него элементы не принимаются до start().
+    """
+
+    def __init__(
+            self,
+            flush: Callable[[List[Any]], Awaitable[None]],
+            max_batch_size: int,
+            flush_interval: float,
+            name: str = "batch-writer",
+            max_queue_size: int = 0,
+    ):
+        self._flush = flush
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+
+    def submit_nowait(self, item: Any) -> None:
+        """
+        Ставит элемент в очередь. Если писатель ещё не запущен, запускает его
+        в текущем event loop. BatchWriterFull - очередь переполнена,
+        BatchWriterStopped - писатель уже остановлен.
+        """
+        if self._stopped:
+            raise BatchWriterStopped(self.name)
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            raise BatchWriterFull(self.name) from None
+
+    async def stop(self) -> None:
+        """
+        Записывает всё, что осталось в очереди, и останавливает фоновую задачу.
+        """
+        self._stopped = True
+        if not self.running:
+            return
+        # В ограниченной очереди метке остановки может понадобиться подождать места
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush_batch(batch)
+
+    async def _flush_batch(self, batch: List[Any]) -> None:
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            logger.error(f"{self.name}: failed to write batch of {len(batch)}: {e}", exc_info=True)
@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+from fastapi import Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, bool, str)):
+        return value
+    return str(value)
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Кодирует ключ последней записи страницы (например, created_at и id)
+    в непрозрачную строку для keyset-пагинации.
+    """
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers) -> List[Any]:
+    """
+    Раскодирует курсор, созданный encode_cursor. Каждое значение
+    преобразуется соответствующим парсером (datetime.fromisoformat, UUID, int...).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(cursor)
+        return [parser(value) for parser, value in zip(parsers, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Некорректный курсор страницы")
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: Optional[int] = None) -> None:
+    """
+    Передаёт метаданные страницы в заголовках, чтобы тело ответа оставалось списком.
+    """
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
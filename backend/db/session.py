@@ -1,14 +1,84 @@
+import time
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from typing import AsyncGenerator
 
 from backend.config import settings
 
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+)
+DB_POOL_CONNECTION_HOLD = Histogram(
+    "db_pool_connection_hold_seconds",
+    "Time a connection stays checked out of the pool",
+)
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Connections checked out of the pool")
+DB_POOL_IDLE = Gauge("db_pool_connections_idle", "Idle connections kept in the pool")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened above pool_size (negative while the pool is filling up)")
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время получения соединения. У пула нет
+    публичного события "запрошено соединение", поэтому замеряется публичный
+    Pool.connect() целиком: ожидание свободного соединения, открытие нового
+    и pre-ping.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+def _connect_args(url: str) -> dict:
+    if not url or not url.startswith("postgresql+asyncpg"):
+        return {}
+    connect_args = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DB_STATEMENT_TIMEOUT:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)}
+    return connect_args
+
+
 async_engine = create_async_engine(
     url=settings.SQLALCHEMY_DATABASE_URL,
     future=True,
-    echo=True,
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=_connect_args(settings.SQLALCHEMY_DATABASE_URL),
 )
 
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(async_engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record) -> None:
+    # Долгое удержание соединений - основная причина ожидания в пуле
+    if connection_record is None:
+        return
+    checked_out_at = connection_record.info.pop("checked_out_at", None)
+    if checked_out_at is not None:
+        DB_POOL_CONNECTION_HOLD.observe(time.perf_counter() - checked_out_at)
+
+
+DB_POOL_IN_USE.set_function(lambda: async_engine.pool.checkedout())
+DB_POOL_IDLE.set_function(lambda: async_engine.pool.checkedin())
+DB_POOL_OVERFLOW.set_function(lambda: async_engine.pool.overflow())
+
 async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
 
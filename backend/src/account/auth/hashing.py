@@ -1,6 +1,30 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt отпускает GIL, поэтому хэширование в отдельных потоках не блокирует
+# event loop и выполняется параллельно; размер пула ограничивает число
+# одновременных хэширований на воркер.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+
+async def _run_in_hash_executor(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
 
 
 class Hasher:
@@ -23,4 +47,28 @@ class Hasher:
         :param password: Пароль, который нужно захэшировать.
         :return: Хэшированный пароль.
         """
-        return pwd_context.hash(password)
\ No newline at end of file
+        return pwd_context.hash(password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """
+        То же, что verify_password, но в пуле потоков хэширования.
+        """
+        return await _run_in_hash_executor(pwd_context.verify, plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """
+        То же, что get_password_hash, но в пуле потоков хэширования.
+        """
+        return await _run_in_hash_executor(pwd_context.hash, password)
+
+    @staticmethod
+    async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Проверяет пароль и, если сохранённый хэш устарел (другая схема или
+        меньше раундов, чем BCRYPT_ROUNDS), возвращает новый хэш.
+
+        :return: (True, новый хэш или None), если пароль верный, иначе (False, None).
+        """
+        return await _run_in_hash_executor(pwd_context.verify_and_update, plain_password, hashed_password)
@@ -15,6 +15,7 @@ from backend.src.account.user.dals import UserDAL
 from backend.src.account.user.models import User
 from backend.db.session import get_db
 from backend.src.account.auth.hashing import Hasher
+from backend.src.account.auth.token_cache import UserPrincipal, token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
@@ -34,8 +35,12 @@ async def authenticate_user(
     user = await _get_user_by_email_for_auth(email=email, db=db)
     if user is None:
         return None
-    if not Hasher.verify_password(password, user.hashed_password):
+    verified, new_hash = await Hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash is not None:
+        # Хэш устарел - сохраняем пересчитанный вместе с коммитом ниже
+        user.hashed_password = new_hash
     try:
         await db.commit()
     except Exception as e:
@@ -50,7 +55,19 @@ async def authenticate_user(
 async def get_current_user_from_token(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
-):
+) -> UserPrincipal:
+    return await get_principal_from_token(token, db)
+
+
+async def get_principal_from_token(token: str, db: AsyncSession) -> UserPrincipal:
+    """
+    Проверяет токен доступа и возвращает пользователя; 401, если токен неверен.
+    Используется и там, где токен приходит не заголовком (websocket).
+    """
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -70,7 +87,11 @@ async def get_current_user_from_token(
     user = await _get_user_by_email_for_auth(email=email, db=db)
     if user is None:
         raise credentials_exception
-    user.roles = roles
-    return user
-
-
+    principal = UserPrincipal(
+        user_id=user.user_id,
+        email=user.email,
+        roles=tuple(roles),
+        is_active=user.is_active,
+    )
+    token_cache.set(token, principal, expires_at=payload.get("exp"))
+    return principal
@@ -1,3 +1,5 @@
+import uuid
+
 from pydantic import BaseModel
 from pydantic import EmailStr
 
@@ -11,3 +13,13 @@ class Token(BaseModel):
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
+
+
+class FaceToken(Token):
+    user_id: uuid.UUID
+    distance: float
+
+
+class FaceMatchOUT(BaseModel):
+    user_id: uuid.UUID
+    distance: float
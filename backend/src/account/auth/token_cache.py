@@ -0,0 +1,69 @@
+import time
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter
+
+from backend.cache.lru import TTLLRUCache
+from backend.config import settings
+from backend.src.account.user.enums import PortalRole
+
+TOKEN_CACHE_HITS = Counter("auth_token_cache_hits_total", "Authenticated requests served from the token cache")
+TOKEN_CACHE_MISSES = Counter("auth_token_cache_misses_total", "Authenticated requests that had to decode the token and query the user")
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    Облегчённое представление текущего пользователя для проверки прав.
+    """
+
+    user_id: UUID
+    email: str
+    roles: Tuple[str, ...]
+    is_active: bool
+
+    @property
+    def is_superadmin(self) -> bool:
+        return PortalRole.ROLE_PORTAL_SUPERADMIN in self.roles
+
+    @property
+    def is_admin(self) -> bool:
+        return PortalRole.ROLE_PORTAL_ADMIN in self.roles
+
+
+class TokenCache:
+    """
+    Кэш проверенный токен -> UserPrincipal на процесс. Запись живёт не дольше
+    TOKEN_CACHE_TTL и не дольше срока действия самого токена; изменения
+    пользователя сбрасывают его записи через invalidate_user.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        principal = self._cache.get(token)
+        if principal is None:
+            TOKEN_CACHE_MISSES.inc()
+        else:
+            TOKEN_CACHE_HITS.inc()
+        return principal
+
+    def set(self, token: str, principal: UserPrincipal, expires_at: Optional[float] = None) -> None:
+        ttl = self._cache.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        self._cache.set(token, principal, ttl=ttl)
+
+    def invalidate_user(self, user_id) -> int:
+        user_id = str(user_id)
+        return self._cache.discard_where(lambda _, principal: str(principal.user_id) == user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
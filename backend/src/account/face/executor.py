@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+from backend.config import settings
+from backend.src.account.face import inference
+
+logger = logging.getLogger(__name__)
+
+FACE_QUEUE_DEPTH = Gauge(
+    "face_inference_queue_depth",
+    "Face inference jobs queued or running in the process pool",
+)
+FACE_INFERENCE_LATENCY = Histogram(
+    "face_inference_latency_seconds",
+    "Face embedding latency including time spent in the queue",
+)
+
+
+class FaceExecutorSaturated(Exception):
+    """Очередь распознавания лиц переполнена."""
+
+
+class FaceInferenceExecutor:
+    """
+    Пул процессов для вычисления эмбеддингов лиц.
+
+    Модель загружается один раз в каждом процессе пула, event loop uvicorn
+    только ждёт результат. Число задач в очереди ограничено: при переполнении
+    новые запросы сразу получают FaceExecutorSaturated, а не копятся в памяти.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, model_name: str):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.model_name = model_name
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=inference.warm_up,
+                initargs=(self.model_name,),
+            )
+        return self._pool
+
+    async def start(self) -> None:
+        """
+        Запускает процессы пула и дожидается загрузки модели в каждом из них.
+        """
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, inference.ping) for _ in range(self.max_workers)
+        ))
+        logger.info(
+            "Face inference pool ready: %d workers in %.1fs",
+            self.max_workers, time.perf_counter() - started,
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _submit(self, fn, *args, bounded: bool = True):
+        if bounded and self._pending >= self.max_queue:
+            raise FaceExecutorSaturated()
+        pool = self._ensure_pool()
+        self._pending += 1
+        FACE_QUEUE_DEPTH.inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args, self.model_name)
+        finally:
+            self._pending -= 1
+            FACE_QUEUE_DEPTH.dec()
+            FACE_INFERENCE_LATENCY.observe(time.perf_counter() - started)
+
+    async def embed(self, image: bytes) -> np.ndarray:
+        """
+        Эмбеддинг лица по байтам загруженного изображения.
+        """
+        return await self._submit(inference.embed_image_bytes, image)
+
+    async def embed_file(self, path: str, bounded: bool = True) -> np.ndarray:
+        """
+        Эмбеддинг лица по файлу на диске (аватары пользователей).
+        """
+        return await self._submit(inference.embed_image_file, path, bounded=bounded)
+
+
+face_executor = FaceInferenceExecutor(
+    max_workers=settings.FACE_WORKERS,
+    max_queue=settings.FACE_MAX_QUEUE,
+    model_name=settings.FACE_MODEL_NAME,
+)
@@ -0,0 +1,300 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_embedding(embedding) -> np.ndarray:
+    """
+    Приводит эмбеддинг к float32 и единичной длине, чтобы косинусная близость
+    считалась обычным скалярным произведением.
+    """
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return vector
+    return vector / norm
+
+
+class FaceMatch(NamedTuple):
+    user_id: str
+    distance: float
+
+
+@contextmanager
+def _file_lock(path: str):
+    """
+    Межпроцессная блокировка на время записи индекса: воркеры приложения и
+    reindex_faces.py не должны затирать изменения друг друга.
+    """
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FaceIndex:
+    """
+    Хранилище эмбеддингов лиц: один вектор Facenet на пользователя (ключ - User.user_id).
+
+    Векторы хранятся нормализованными в одной матрице, поэтому поиск ближайшего
+    лица - это одно матричное произведение вместо DeepFace.verify по каждому аватару.
+    Словарь user_id -> строка матрицы позволяет добавлять, заменять и удалять
+    пользователей без перестроения индекса.
+
+    На диске каждая версия индекса - отдельный каталог с embeddings.npy
+    (float32) и ids.npy, а файл CURRENT указывает на действующую версию и
+    подменяется через os.replace: читатель видит либо старую пару файлов,
+    либо новую. Файл эмбеддингов открывается через mmap, поэтому воркер
+    начинает обслуживать вход по лицу сразу, не читая индекс целиком; копия в
+    памяти создаётся только при первом изменении. Индекс старого формата
+    (embeddings.npy и ids.npy прямо в каталоге) читается, пока не появится CURRENT.
+
+    Изменения, ещё не сохранённые этим процессом, помнятся отдельно: save под
+    файловой блокировкой перечитывает индекс, если его записал другой процесс,
+    и накладывает свои изменения поверх.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    IDS_FILE = "ids.npy"
+    CURRENT_FILE = "CURRENT"
+    LOCK_FILE = "index.lock"
+    VERSION_PREFIX = "v-"
+    # Сколько предыдущих версий оставлять: их ещё может читать другой воркер
+    KEEP_VERSIONS = 2
+    MIN_CAPACITY = 16
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.loaded = False
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._version: Optional[str] = None
+        # Несохранённые изменения: user_id -> вектор или None (удаление)
+        self._pending: Dict[str, Optional[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._positions
+
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.directory, self.CURRENT_FILE)
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(self.directory, self.LOCK_FILE)
+
+    def _current_version(self) -> Optional[str]:
+        """
+        Имя каталога действующей версии; "" - индекс старого формата в самом
+        каталоге; None - индекса нет.
+        """
+        try:
+            with open(self.current_path, encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            legacy = os.path.join(self.directory, self.EMBEDDINGS_FILE)
+            if os.path.exists(legacy) and os.path.exists(os.path.join(self.directory, self.IDS_FILE)):
+                return ""
+            return None
+        if not version.startswith(self.VERSION_PREFIX) or os.sep in version or "/" in version:
+            raise ValueError(f"Face index pointer at {self.current_path} is corrupted")
+        return version
+
+    def _read(self, version: str) -> Tuple[List[str], Optional[np.ndarray]]:
+        path = os.path.join(self.directory, version)
+        ids = [str(user_id) for user_id in np.load(os.path.join(path, self.IDS_FILE), allow_pickle=False)]
+        matrix = np.load(os.path.join(path, self.EMBEDDINGS_FILE), mmap_mode="r") if ids else None
+        if matrix is not None and (matrix.dtype != np.float32 or matrix.ndim != 2 or matrix.shape[0] != len(ids)):
+            raise ValueError(f"Face index at {path} is corrupted")
+        return ids, matrix
+
+    def load(self) -> bool:
+        """
+        Загружает индекс с диска. Возвращает False, если индекс ещё не построен;
+        при ошибке чтения исключение выбрасывается, а индекс в памяти не меняется.
+        Несохранённые изменения этого процесса применяются поверх прочитанного.
+        """
+        version = self._current_version()
+        if version is None:
+            return False
+        ids, matrix = self._read(version)
+        with self._lock:
+            self._matrix = matrix
+            self._ids = ids
+            self._positions = {user_id: position for position, user_id in enumerate(ids)}
+            self._version = version
+            self.loaded = True
+            for user_id, vector in self._pending.items():
+                if vector is None:
+                    self._remove_locked(user_id)
+                else:
+                    self._upsert_locked(user_id, vector)
+        logger.info("Face index loaded: %d embeddings", len(ids))
+        return True
+
+    def reload_if_stale(self) -> bool:
+        """
+        Перечитывает индекс, если опубликована другая версия (например,
+        переиндексацией из reindex_faces.py или другим воркером).
+        """
+        version = self._current_version()
+        if version is None or version == self._version:
+            return False
+        return self.load()
+
+    def _ensure_writable(self) -> None:
+        # Матрица, открытая через mmap, доступна только для чтения
+        if self._matrix is not None and not self._matrix.flags.writeable:
+            self._matrix = np.array(self._matrix, dtype=np.float32)
+
+    def save(self, merge: bool = True) -> None:
+        """
+        Сохраняет индекс на диск новой версией: файлы пишутся в новый каталог,
+        затем CURRENT атомарно переключается на него. С merge=True изменения
+        этого процесса накладываются на актуальную версию; merge=False
+        записывает индекс из памяти как есть (полная переиндексация).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with _file_lock(self.lock_path):
+            if merge and self._current_version() not in (None, self._version):
+                self.load()
+            with self._lock:
+                size = len(self._ids)
+                if self._matrix is None:
+                    matrix = np.empty((0, 0), dtype=np.float32)
+                else:
+                    matrix = np.ascontiguousarray(self._matrix[:size], dtype=np.float32)
+                ids = np.asarray(self._ids, dtype=str)
+                self._pending.clear()
+                self.loaded = True
+
+            version = f"{self.VERSION_PREFIX}{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+            path = os.path.join(self.directory, version)
+            os.makedirs(path)
+            np.save(os.path.join(path, self.EMBEDDINGS_FILE), matrix)
+            np.save(os.path.join(path, self.IDS_FILE), ids)
+            tmp_path = f"{self.current_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(tmp_path, self.current_path)
+            self._version = version
+            self._remove_old_versions(version)
+
+    def _remove_old_versions(self, current: str) -> None:
+        versions = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(self.VERSION_PREFIX) and name != current
+        )
+        for name in versions[:-self.KEEP_VERSIONS] if self.KEEP_VERSIONS else versions:
+            try:
+                shutil.rmtree(os.path.join(self.directory, name))
+            except OSError as e:
+                # Файл ещё открыт через mmap (Windows) - удалим при следующей записи
+                logger.warning(f"Face index version {name} not removed: {e}")
+
+    def upsert(self, user_id, embedding) -> None:
+        """
+        Добавляет или заменяет эмбеддинг пользователя. Матрица растёт с запасом,
+        поэтому добавление не копирует весь индекс каждый раз.
+        """
+        key = str(user_id)
+        vector = normalize_embedding(embedding)
+        with self._lock:
+            self._upsert_locked(key, vector)
+            self._pending[key] = vector
+
+    def remove(self, user_id) -> bool:
+        """
+        Удаляет пользователя из индекса: на его место переносится последняя строка.
+        """
+        key = str(user_id)
+        with self._lock:
+            if key not in self._positions:
+                return False
+            self._remove_locked(key)
+            self._pending[key] = None
+            return True
+
+    def _upsert_locked(self, key: str, vector: np.ndarray) -> None:
+        self._ensure_writable()
+        position = self._positions.get(key)
+        if position is not None:
+            self._matrix[position] = vector
+            return
+        size = len(self._ids)
+        if self._matrix is None:
+            self._matrix = np.empty((self.MIN_CAPACITY, vector.shape[0]), dtype=np.float32)
+        elif size == self._matrix.shape[0]:
+            grown = np.empty((max(self.MIN_CAPACITY, size * 2), self._matrix.shape[1]), dtype=np.float32)
+            grown[:size] = self._matrix[:size]
+            self._matrix = grown
+        self._matrix[size] = vector
+        self._ids.append(key)
+        self._positions[key] = size
+
+    def _remove_locked(self, key: str) -> None:
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        self._ensure_writable()
+        last = len(self._ids) - 1
+        if position != last:
+            last_id = self._ids[last]
+            self._matrix[position] = self._matrix[last]
+            self._ids[position] = last_id
+            self._positions[last_id] = position
+        self._ids.pop()
+
+    def search(self, embedding, top_k: int = 1, threshold: Optional[float] = None) -> List[FaceMatch]:
+        """
+        Возвращает до top_k ближайших лиц по косинусному расстоянию (от ближнего
+        к дальнему). Если задан threshold, более далёкие совпадения отбрасываются.
+        """
+        query = normalize_embedding(embedding)
+        with self._lock:
+            size = len(self._ids)
+            if not size or top_k < 1:
+                return []
+            distances = 1.0 - self._matrix[:size] @ query
+            k = min(top_k, size)
+            if k < size:
+                candidates = np.argpartition(distances, k - 1)[:k]
+            else:
+                candidates = np.arange(size)
+            candidates = candidates[np.argsort(distances[candidates])]
+            matches = [FaceMatch(self._ids[i], float(distances[i])) for i in candidates]
+        if threshold is not None:
+            matches = [match for match in matches if match.distance <= threshold]
+        return matches
+
+
+face_index = FaceIndex(settings.FACE_INDEX_DIR)
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+from typing import List, Optional, Tuple
+
+# Функции этого модуля выполняются в процессах пула распознавания лиц.
+# DeepFace (и TensorFlow вместе с ним) импортируется только внутри процессов пула,
+# чтобы не загружать модель в процесс uvicorn.
+
+UNREADABLE = "unreadable"
+NO_FACE = "no_face"
+
+
+def warm_up(model_name: str) -> None:
+    """
+    Инициализатор процесса пула: загружает модель один раз при старте процесса.
+    """
+    from deepface import DeepFace
+    DeepFace.build_model(model_name)
+
+
+def ping() -> bool:
+    return True
+
+
+def represent_face(img, model_name: str) -> np.ndarray:
+    """
+    Вычисляет эмбеддинг лица. img - путь к изображению или массив BGR.
+    """
+    from deepface import DeepFace
+    result = DeepFace.represent(img_path=img, model_name=model_name)
+    return np.asarray(result[0]["embedding"], dtype=np.float32)
+
+
+def embed_image_bytes(data: bytes, model_name: str) -> np.ndarray:
+    """
+    Декодирует изображение из памяти и вычисляет эмбеддинг без записи на диск.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Не удалось прочитать изображение")
+    return represent_face(image, model_name)
+
+
+def embed_image_file(path: str, model_name: str) -> np.ndarray:
+    return represent_face(path, model_name)
+
+
+def embed_image_files(paths: List[str], model_name: str) -> List[Tuple[Optional[np.ndarray], Optional[str]]]:
+    """
+    Пакетная обработка файлов для переиндексации: для каждого пути возвращает
+    (эмбеддинг, None) или (None, причина ошибки) - UNREADABLE, если файл не
+    читается как изображение или его обработка упала, NO_FACE, если на нём не
+    найдено лицо. Ошибка одного файла не прерывает обработку пачки.
+    """
+    results = []
+    for path in paths:
+        try:
+            image = cv2.imread(path)
+            if image is None:
+                results.append((None, UNREADABLE))
+                continue
+            results.append((represent_face(image, model_name), None))
+        except ValueError:
+            results.append((None, NO_FACE))
+        except Exception as e:
+            results.append((None, f"{UNREADABLE}: {type(e).__name__}: {e}"))
+    return results
@@ -1,40 +1,90 @@
-import os
-import uuid
 # from fastapi_cache.decorator import cache
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from datetime import timedelta
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.config import settings
+from backend.src.account.auth.jwt import get_current_user_from_token
+from backend.src.account.auth.schemas import FaceToken, FaceMatchOUT
 from backend.src.account.auth.security import create_access_token, create_refresh_token
-from backend.src.account.face.utils import is_face_similar
+from backend.src.account.face.executor import FaceExecutorSaturated
+from backend.src.account.face.index import FaceMatch
+from backend.src.account.face.utils import (
+    FaceIndexNotReady, find_face_matches, ensure_face_index, forget_user_face,
+)
+from backend.src.account.user.dals import User, UserDAL
+from backend.db.session import get_db
 
 router = APIRouter()
 
 
-@router.post("/auth/face")
-# @cache(expire=60)
-async def authenticate_face(image: UploadFile = File(...)):
-    temp_dir = 'static/face-save/'
-    os.makedirs(temp_dir, exist_ok=True)
-
-    unique_filename = f"{uuid.uuid4()}.jpg"
-    file_path = os.path.join(temp_dir, unique_filename)
+async def _match_face(
+        image: UploadFile,
+        top_k: int,
+        threshold: Optional[float],
+) -> List[FaceMatch]:
+    try:
+        await ensure_face_index()
+    except FaceIndexNotReady:
+        raise HTTPException(
+            status_code=503,
+            detail="Индекс лиц ещё строится, повторите попытку позже",
+            headers={"Retry-After": "30"},
+        )
 
+    contents = await image.read()
     try:
-        # Сохранение загруженного изображения во временную папку
-        with open(file_path, "wb") as f:
-            contents = await image.read()
-            f.write(contents)
-
-        # Проверка схожести лиц
-        if is_face_similar(file_path, 'static/avatars/'):
-            # Генерация токена, если лицо найдено
-            token_data = {"sub": "user_id"}  # Замените на реальный идентификатор пользователя
-            access_token = create_access_token(data=token_data, expires_delta=timedelta(minutes=480))
-            refresh_token = create_refresh_token(data=token_data, expires_delta=timedelta(minutes=30))
-            return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
-        else:
-            raise HTTPException(status_code=401, detail="Face not recognized")
+        return await find_face_matches(contents, top_k=top_k, threshold=threshold)
+    except FaceExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Сервис распознавания перегружен, повторите попытку позже")
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=f"Face not recognized: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Такого пользователя нету: {e}")
-    finally:
-        os.remove(file_path)
+
+
+@router.post("/auth/face", response_model=FaceToken)
+# @cache(expire=60)
+async def authenticate_face(
+        image: UploadFile = File(...),
+        db: AsyncSession = Depends(get_db),
+):
+    matches = await _match_face(image, top_k=1, threshold=settings.FACE_DISTANCE_THRESHOLD)
+    if not matches:
+        raise HTTPException(status_code=401, detail="Face not recognized")
+    match = matches[0]
+
+    user = await UserDAL(db).get_user_by_id(match.user_id)
+    if user is None or not user.is_active:
+        # Пользователь удалён или отключён после построения индекса
+        await forget_user_face(match.user_id)
+        raise HTTPException(status_code=401, detail="Face not recognized")
+
+    # Генерация токенов для найденного пользователя
+    access_token = create_access_token(
+        data={"sub": user.email, "roles": user.roles},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    refresh_token = create_refresh_token(
+        data={"sub": user.email},
+        expires_delta=timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+    )
+    return FaceToken(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer",
+        user_id=user.user_id,
+        distance=match.distance,
+    )
+
+
+@router.post("/auth/face/candidates", response_model=List[FaceMatchOUT])
+async def face_candidates(
+        image: UploadFile = File(...),
+        top_k: int = Query(settings.FACE_TOP_K, ge=1, le=100),
+        threshold: Optional[float] = Query(settings.FACE_DISTANCE_THRESHOLD, ge=0, le=2),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    matches = await _match_face(image, top_k=top_k, threshold=threshold)
+    return [FaceMatchOUT(user_id=match.user_id, distance=match.distance) for match in matches]
@@ -1,25 +1,165 @@
-import os
-from deepface import DeepFace
+import asyncio
 import logging
 
+from typing import Iterable, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from backend.config import settings
+from backend.src.account.face.executor import face_executor
+from backend.src.account.face.index import FaceMatch, face_index
+from backend.src.account.user.models import User
+from backend.db.session import async_session_factory
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_index_build_lock = asyncio.Lock()
+_index_build_task: Optional[asyncio.Task] = None
+
+
+async def find_face_matches(
+        image: bytes,
+        top_k: int = 1,
+        threshold: Optional[float] = settings.FACE_DISTANCE_THRESHOLD,
+) -> List[FaceMatch]:
+    """
+    Ищет пользователей, похожих на лицо с загруженного изображения.
+    Изображение прогоняется через модель один раз в пуле процессов, сравнение с
+    аватарами - поиск ближайших соседей по индексу эмбеддингов.
+    """
+    embedding = await face_executor.embed(image)
+    return face_index.search(embedding, top_k=top_k, threshold=threshold)
+
 
-def is_face_similar(uploaded_img_path: str, user_images_folder: str, model_name: str = "Facenet") -> bool:
+async def enroll_face(user_id, img_path: str) -> bool:
     """
-    Проверяет схожесть лиц на загруженном изображении и всех изображениях из папки пользователя.
+    Добавляет (или заменяет) эмбеддинг аватара пользователя в индексе.
+    Загрузка аватаров не ограничивается очередью входа по лицу.
     """
     try:
-        for file_name in os.listdir(user_images_folder):
-            user_img_path = os.path.join(user_images_folder, file_name)
-            try:
-                result = DeepFace.verify(uploaded_img_path, user_img_path, model_name=model_name)
-                if result['verified']:
-                    return True
-            except Exception as e:
-                logger.error(f"Error comparing faces: {e}")
+        embedding = await face_executor.embed_file(img_path, bounded=False)
+    except Exception as e:
+        logger.error(f"Error enrolling face for user {user_id}: {e}")
         return False
+    face_index.upsert(user_id, embedding)
+    return True
+
+
+async def build_face_index(avatars: Iterable[Tuple[str, str]]) -> int:
+    """
+    Строит индекс по парам (user_id, путь к аватару) и сохраняет его на диск.
+    Аватары обрабатываются пачками по числу процессов пула. Индекс строится
+    заново, поэтому файл на диске (возможно, нечитаемый) заменяется целиком.
+    """
+    avatars = list(avatars)
+    batch_size = face_executor.max_workers
+    enrolled = 0
+    for start in range(0, len(avatars), batch_size):
+        batch = avatars[start:start + batch_size]
+        results = await asyncio.gather(*(
+            enroll_face(user_id, avatar) for user_id, avatar in batch
+        ))
+        enrolled += sum(results)
+    await run_in_threadpool(face_index.save, False)
+    logger.info("Face index built: %d embeddings", enrolled)
+    return enrolled
+
+
+async def _load_face_index() -> bool:
+    """
+    Загружает индекс с диска. Если файл не читается, в памяти остаётся
+    прежний индекс, а ошибка только пишется в лог.
+    """
+    try:
+        return await run_in_threadpool(face_index.load)
     except Exception as e:
-        logger.error(f"Error reading user images folder: {e}")
+        logger.error(f"Face index at {face_index.directory} could not be loaded: {e}")
         return False
+
+
+class FaceIndexNotReady(Exception):
+    """
+    Индекс эмбеддингов ещё строится - вход по лицу временно недоступен.
+    """
+
+
+async def _build_face_index_from_db() -> None:
+    """
+    Строит индекс по аватарам активных пользователей в собственной сессии БД,
+    не занимая запрос входа. Ошибка сборки пишется в лог, следующий запрос
+    входа запустит сборку заново.
+    """
+    async with _index_build_lock:
+        if face_index.loaded or await _load_face_index():
+            return
+        try:
+            async with async_session_factory() as session:
+                query = select(User.user_id, User.avatar).where(User.avatar.isnot(None), User.is_active == True)
+                avatars = (await session.execute(query)).all()
+            await build_face_index(avatars)
+        except Exception as e:
+            logger.error(f"Face index build failed: {e}")
+
+
+def start_face_index_build() -> None:
+    """
+    Запускает фоновую сборку индекса, если она ещё не идёт. Вызывается при
+    старте приложения и из входа по лицу, пока индекса нет на диске.
+    Для больших баз индекс лучше заранее собрать скриптом reindex_faces.py.
+    """
+    global _index_build_task
+    if _index_build_task is None or _index_build_task.done():
+        _index_build_task = asyncio.create_task(_build_face_index_from_db())
+
+
+async def stop_face_index_build() -> None:
+    """
+    Прерывает незавершённую фоновую сборку при остановке приложения.
+    """
+    if _index_build_task is not None and not _index_build_task.done():
+        _index_build_task.cancel()
+        try:
+            await _index_build_task
+        except asyncio.CancelledError:
+            pass
+
+
+async def ensure_face_index() -> None:
+    """
+    Проверяет, что индекс загружен. Если его ещё нет (или файл не читается),
+    запускает фоновую сборку и бросает FaceIndexNotReady - запрос входа не
+    ждёт сборки. Ошибка перечитывания уже загруженного индекса не прерывает
+    вход: используется прежняя версия.
+    """
+    if face_index.loaded:
+        try:
+            await run_in_threadpool(face_index.reload_if_stale)
+        except Exception as e:
+            logger.error(f"Face index reload failed, keeping the previous one: {e}")
+        return
+    if not _index_build_lock.locked() and await _load_face_index():
+        return
+    start_face_index_build()
+    raise FaceIndexNotReady()
+
+
+async def enroll_user_avatar(user_id, avatar_path: str) -> bool:
+    """
+    Обновляет эмбеддинг пользователя после загрузки нового аватара.
+    """
+    if not face_index.loaded and not await _load_face_index():
+        # Индекс ещё не построен - аватар попадёт в него при первой сборке
+        return False
+    if not await enroll_face(user_id, avatar_path):
+        return False
+    await run_in_threadpool(face_index.save)
+    return True
+
+
+async def forget_user_face(user_id) -> None:
+    """
+    Убирает пользователя из индекса (удаление или отключение учётной записи).
+    """
+    if face_index.remove(user_id):
+        await run_in_threadpool(face_index.save)
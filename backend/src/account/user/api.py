@@ -1,8 +1,8 @@
+import json
 import logging
-import aiofiles
 
 # from fastapi_cache.decorator import cache
-from datetime import date
+from datetime import date, datetime
 from logging import getLogger
 from typing import List, Optional
 from uuid import UUID
@@ -12,18 +12,23 @@ from fastapi import File, Form
 from fastapi import UploadFile
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Response
 from fastapi import status
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.config import settings
+from backend.db.pagination import set_page_headers
 from backend.src.account.auth.hashing import Hasher
 from backend.src.account.auth.jwt import get_current_user_from_token
+from backend.src.account.face.utils import enroll_user_avatar, forget_user_face
 from backend.src.account.user.crud import _delete_user
 from backend.src.account.user.crud import _disabled
 from backend.src.account.user.crud import _get_user_by_id
-from backend.src.account.user.crud import _get_as_active
-from backend.src.account.user.crud import _get_all_users
+from backend.src.account.user.crud import _get_users_page
 from backend.src.account.user.crud import check_user_permissions
 from backend.src.account.user.enums import PortalRole
 from backend.src.account.user.schemas import DeleteUserResponse, ResetPasswordRequest, ActionHistorySchema
@@ -31,7 +36,9 @@ from backend.src.account.user.schemas import ShowUser
 from backend.src.account.user.schemas import UpdatedUserResponse
 from backend.src.account.user.schemas import RoleUpdate
 from backend.src.account.user.dals import User, UserDAL
-from backend.db.session import get_db
+from backend.db.session import get_db, async_session_factory
+from backend.storage.thumbnails import thumbnail_generator
+from backend.storage.uploads import save_upload
 
 logger = getLogger(__name__)
 logging.basicConfig(filename='log/user.log', level=logging.INFO)
@@ -54,19 +61,14 @@ async def create_user(
         db: AsyncSession = Depends(get_db)
 ) -> ShowUser:
     user_dal = UserDAL(db)
-    hashed_password = Hasher.get_password_hash(password)
+    hashed_password = await Hasher.get_password_hash_async(password)
 
     # Process avatar file
-    avatar_filename = None
+    avatar_filename = avatar_sha256 = None
     if avatar:
-        try:
-            avatar_filename = f"static/avatars/{avatar.filename}"
-            async with aiofiles.open(avatar_filename, "wb") as buffer:
-                content = await avatar.read()
-                await buffer.write(content)
-        except Exception as e:
-            logger.error(f"Error saving avatar file: {e}")
-            raise HTTPException(status_code=500, detail="Error saving avatar file")
+        stored = await save_upload(avatar, "avatars", max_size=settings.AVATAR_MAX_SIZE, content_types=("image/",))
+        avatar_filename, avatar_sha256 = stored.path, stored.sha256
+        await thumbnail_generator.generate_quietly(stored.path, stored.sha256)
 
     try:
         async with db.begin():  # Ensure transaction scope
@@ -78,11 +80,11 @@ async def create_user(
                 email=email,
                 inn=inn,
                 avatar=avatar_filename,
+                avatar_sha256=avatar_sha256,
                 job_title=job_title,
                 hashed_password=hashed_password,
                 roles=roles,
             )
-            return new_user
     except IntegrityError as err:
         logger.error(f"IntegrityError: {err}")
         await db.rollback()
@@ -96,31 +98,58 @@ async def create_user(
         await db.rollback()
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
+    if avatar_filename:
+        await enroll_user_avatar(new_user.user_id, avatar_filename)
+    return new_user
+
 
 @user_router.get("/all/", response_model=List[ShowUser])
 # @cache(expire=60)
 async def get_all(
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    role: Optional[PortalRole] = None,
+    is_active: Optional[bool] = None,
+    job_title: Optional[str] = None,
+    search: Optional[str] = Query(None, min_length=2),
+    with_total: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token),
 ) -> List[ShowUser]:
-    all_users = await _get_all_users(db)
-    if not all_users:
+    all_users, next_cursor, total = await _get_users_page(
+        db, limit=limit, cursor=cursor, role=role, is_active=is_active,
+        job_title=job_title, search=search, with_total=with_total,
+    )
+    if not all_users and cursor is None:
         raise HTTPException(
             status_code=404, detail=f"Колдонуучулар жок."
         )
+    set_page_headers(response, next_cursor, total)
     return all_users
 
 
 @user_router.get("/is_active/", response_model=List[ShowUser])
 async def get_is_active(
+    response: Response,
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    role: Optional[PortalRole] = None,
+    job_title: Optional[str] = None,
+    search: Optional[str] = Query(None, min_length=2),
+    with_total: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_token),
 ) -> List[ShowUser]:
-    is_active_users = await _get_as_active(db)
-    if not is_active_users:
+    is_active_users, next_cursor, total = await _get_users_page(
+        db, limit=limit, cursor=cursor, role=role, is_active=True,
+        job_title=job_title, search=search, with_total=with_total,
+    )
+    if not is_active_users and cursor is None:
         raise HTTPException(
             status_code=404, detail=f"Колдонучулар жок."
         )
+    set_page_headers(response, next_cursor, total)
     return is_active_users
 
 
@@ -162,16 +191,11 @@ async def update_user(
     if not check_user_permissions(target_user, current_user):
         raise HTTPException(status_code=403, detail="You do not have permission to modify this user.")
 
-    avatar_filename = target_user.avatar
+    avatar_filename, avatar_sha256 = target_user.avatar, target_user.avatar_sha256
     if avatar:
-        try:
-            avatar_filename = f"static/avatars/{avatar.filename}"
-            async with aiofiles.open(avatar_filename, "wb") as buffer:
-                content = await avatar.read()
-                await buffer.write(content)
-        except Exception as e:
-            logger.error(f"Error saving avatar file: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail="Error saving avatar file")
+        stored = await save_upload(avatar, "avatars", max_size=settings.AVATAR_MAX_SIZE, content_types=("image/",))
+        avatar_filename, avatar_sha256 = stored.path, stored.sha256
+        await thumbnail_generator.generate_quietly(stored.path, stored.sha256)
 
     try:
         user_update_dict = {
@@ -184,6 +208,7 @@ async def update_user(
             'job_title': job_title,
             'roles': roles,
             'avatar': avatar_filename,
+            'avatar_sha256': avatar_sha256,
             'is_superuser': is_superuser,
         }
 
@@ -191,6 +216,8 @@ async def update_user(
         user_update_dict = {k: v for k, v in user_update_dict.items() if v is not None}
 
         await user_dal.update_user(user_id, user_update_dict)
+        if avatar:
+            await enroll_user_avatar(user_id, avatar_filename)
         # Верните обновленные данные
         return await user_dal.get_user_by_id(user_id)
 
@@ -248,6 +275,7 @@ async def delete_user(
     try:
         deleted_user_id = await _delete_user(user_id, db)
         if deleted_user_id:
+            await forget_user_face(deleted_user_id)
             return DeleteUserResponse(deleted_user_id=deleted_user_id)
         else:
             raise HTTPException(status_code=404, detail="User not found")
@@ -268,6 +296,8 @@ async def disabled_user(
 
     try:
         disabled_user_id = await _disabled(user_id, db)
+        if disabled_user_id:
+            await forget_user_face(disabled_user_id)
         return DeleteUserResponse(deleted_user_id=disabled_user_id)
     except HTTPException as e:
         raise e
@@ -298,7 +328,7 @@ async def reset_password(
                             detail="Not authorized to reset password for this user")
 
     # Хэширование нового пароля и обновление пользователя
-    user_to_update.hashed_password = Hasher.get_password_hash(data.new_password)
+    user_to_update.hashed_password = await Hasher.get_password_hash_async(data.new_password)
     await db.commit()
 
     return UpdatedUserResponse(updated_user_id=user_id, message="Пароль изменен")
@@ -306,23 +336,73 @@ async def reset_password(
 
 @user_router.get("/history/all", response_model=List[ActionHistorySchema])
 async def get_all_history(
+        response: Response,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        action: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
         db: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token)
 ):
 
     user_dal = UserDAL(db)
-    history = await user_dal.get_all_history()
+    history, next_cursor = await user_dal.get_history_page(
+        limit, cursor, user_id=user_id, action=action, since=since, until=until,
+    )
+    set_page_headers(response, next_cursor)
     return history
 
 
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+@user_router.get("/history/export")
+async def export_history(
+        user_id: Optional[UUID] = None,
+        action: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        current_user: User = Depends(get_current_user_from_token)
+):
+    """
+    Выгрузка истории действий в формате NDJSON (одна запись на строку) для аудита.
+    """
+    async def rows():
+        # Сессия открывается внутри генератора: зависимость get_db закрывается
+        # до того, как StreamingResponse начнёт отдавать тело ответа.
+        async with async_session_factory() as session:
+            async for row in UserDAL(session).stream_history(
+                user_id=user_id, action=action, since=since, until=until,
+            ):
+                yield json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="user_action_history.ndjson"'},
+    )
+
+
 @user_router.get("/history/{user_id}", response_model=List[ActionHistorySchema])
 async def get_user_history(
         user_id: UUID,
+        response: Response,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        action: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
         db: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token)
 ):
     user_dal = UserDAL(db)
-    history = await user_dal.get_user_history(user_id)
+    history, next_cursor = await user_dal.get_history_page(
+        limit, cursor, user_id=user_id, action=action, since=since, until=until,
+    )
+    set_page_headers(response, next_cursor)
     return history
-
-
@@ -0,0 +1,89 @@
+import logging
+import uuid
+
+from datetime import datetime
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.db.batch import BatchWriter, BatchWriterFull, BatchWriterStopped
+from backend.db.session import async_session_factory
+from backend.src.account.user.models import UserActionHistory
+
+logger = logging.getLogger(__name__)
+
+PENDING_AUDIT_KEY = "pending_audit"
+
+
+async def _write_audit_batch(entries: List[dict]) -> None:
+    """
+    Записывает пачку событий одним INSERT. Если пачка не проходит по внешнему
+    ключу (пользователя удалили, пока событие ждало в очереди), события
+    записываются по одному, чтобы не потерять остальные.
+    """
+    async with async_session_factory() as session:
+        try:
+            await session.execute(insert(UserActionHistory).values(entries))
+            await session.commit()
+            return
+        except IntegrityError:
+            await session.rollback()
+        for entry in entries:
+            try:
+                await session.execute(insert(UserActionHistory).values(entry))
+                await session.commit()
+            except IntegrityError as e:
+                await session.rollback()
+                logger.warning(f"Dropping audit entry for user {entry['user_id']}: {e.orig}")
+
+
+audit_writer = BatchWriter(
+    _write_audit_batch,
+    max_batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+    name="audit-log",
+    max_queue_size=settings.AUDIT_QUEUE_SIZE,
+)
+
+
+def record_action(session, user_id: UUID, name: str, action: str, details: str) -> None:
+    """
+    Регистрирует событие истории в рамках текущей транзакции session.
+
+    В режиме outbox запись добавляется в саму транзакцию. В режиме batched
+    событие уходит в очередь только после коммита транзакции (и отбрасывается
+    при откате), поэтому в истории не появляются несостоявшиеся изменения.
+    """
+    entry = dict(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        name=name,
+        action=action,
+        details=details,
+        timestamp=datetime.utcnow(),
+    )
+    if settings.AUDIT_LOG_MODE == "outbox":
+        session.add(UserActionHistory(**entry))
+        return
+    session.info.setdefault(PENDING_AUDIT_KEY, []).append(entry)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_pending_audit(session: Session) -> None:
+    for entry in session.info.pop(PENDING_AUDIT_KEY, ()):
+        try:
+            audit_writer.submit_nowait(entry)
+        except (BatchWriterFull, BatchWriterStopped) as e:
+            # Изменение уже закоммичено - теряется только запись истории
+            logger.error(f"Dropping audit entry for user {entry['user_id']}: {type(e).__name__}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_audit(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_AUDIT_KEY, None)
@@ -3,31 +3,73 @@ from fastapi import HTTPException
 from fastapi import UploadFile
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Union, List, Dict
+from sqlalchemy import select, func, or_, cast, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Union, List, Dict, Optional, Tuple
 from uuid import UUID
 
+from backend.config import settings
+from backend.db.pagination import encode_cursor, decode_cursor
 from backend.src.account.user.schemas import ShowUser
 from backend.src.account.user.schemas import UserCreate
 from backend.src.account.user.dals import UserDAL, logger
 from backend.src.account.user.models import PortalRole
 from backend.src.account.user.models import User
 from backend.src.account.auth.hashing import Hasher
-
-
-async def _get_all_users(session: AsyncSession) -> List[ShowUser]:
-    qs = await session.execute(select(User))
-    users = qs.scalars().all()
-    return users
-
-
-async def _get_as_active(session: AsyncSession) -> List[ShowUser]:
-    query = select(User).where(User.is_active == True)
-    res = await session.execute(query)
-    return res.scalars().all()
+from backend.src.account.auth.token_cache import token_cache
+from backend.storage.uploads import save_upload
+
+
+async def _get_users_page(
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        role: Optional[PortalRole] = None,
+        is_active: Optional[bool] = None,
+        job_title: Optional[str] = None,
+        search: Optional[str] = None,
+        with_total: bool = False,
+) -> Tuple[List[User], Optional[str], Optional[int]]:
+    """
+    Страница пользователей с keyset-пагинацией по (created_at, user_id).
+    Возвращает пользователей, курсор следующей страницы и общее число
+    подходящих записей (только если with_total).
+    """
+    filters = []
+    if is_active is not None:
+        filters.append(User.is_active == is_active)
+    if role is not None:
+        filters.append(cast(User.roles, JSONB).contains([role.value]))
+    if job_title:
+        filters.append(User.job_title == job_title)
+    if search:
+        filters.append(or_(
+            User.name.icontains(search, autoescape=True),
+            User.surname.icontains(search, autoescape=True),
+            User.email.icontains(search, autoescape=True),
+        ))
+
+    total = None
+    if with_total:
+        total = await session.scalar(select(func.count()).select_from(User).where(*filters))
+
+    query = select(User).where(*filters)
+    if cursor:
+        created_at, user_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+        query = query.where(tuple_(User.created_at, User.user_id) > tuple_(created_at, user_id))
+    query = query.order_by(User.created_at, User.user_id).limit(limit + 1)
+
+    result = await session.execute(query)
+    users = result.scalars().all()
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].user_id)
+    return users, next_cursor, total
 
 
 async def _create_new_user(body: UserCreate, session: AsyncSession) -> ShowUser:
+    hashed_password = await Hasher.get_password_hash_async(body.password)
     async with session.begin():
         user_dal = UserDAL(session)
         user = await user_dal.create_user(
@@ -41,7 +83,7 @@ async def _create_new_user(body: UserCreate, session: AsyncSession) -> ShowUser:
             avatar=body.avatar,
             job_title=body.job_title,
 
-            hashed_password=Hasher.get_password_hash(body.password),
+            hashed_password=hashed_password,
             roles=body.roles,
             # roles=[
             #     PortalRole.ROLE_PORTAL_USER,
@@ -93,6 +135,7 @@ async def _update_user(user_id: UUID, updated_user_data: Dict[str, any], session
 
         # Сохранение изменений
         await session.commit()
+        token_cache.invalidate_user(user_id)
     except SQLAlchemyError as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=f"Database update error: {str(e)}")
@@ -107,14 +150,8 @@ async def _get_user_by_id(user_id: UUID, db: AsyncSession) -> Union[User, None]:
 
 
 async def _save_file_to_static(file: UploadFile) -> str:
-    try:
-        file_location = f"static/{file.filename}"
-        with open(file_location, "wb") as buffer:
-            buffer.write(file.file.read())
-        return file_location
-    except Exception as e:
-        logger.error(f"Ошибка сохранения файла: {e}")
-        raise HTTPException(status_code=500, detail="Не удалось сохранить файл")
+    stored = await save_upload(file, "files", max_size=settings.CHAT_ATTACHMENT_MAX_SIZE)
+    return stored.path
 
 
 def check_user_permissions(target_user: User, current_user: User) -> bool:
@@ -1,7 +1,7 @@
 import logging
 
 from logging import getLogger
-from typing import Union, List, Dict, Optional
+from typing import AsyncIterator, Union, List, Dict, Optional, Tuple
 from uuid import UUID
 from datetime import date, datetime
 from fastapi import HTTPException
@@ -10,12 +10,15 @@ from fastapi import UploadFile
 from sqlalchemy import select
 from sqlalchemy import delete
 from sqlalchemy import update
+from sqlalchemy import tuple_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.db.pagination import encode_cursor, decode_cursor
+from backend.src.account.auth.token_cache import token_cache
+from backend.src.account.user.audit import record_action
 from backend.src.account.user.models import PortalRole, UserActionHistory
 from backend.src.account.user.models import User
-from backend.src.account.user.schemas import ActionHistorySchema
 
 logger = getLogger(__name__)
 logging.basicConfig(filename='log/user.log', level=logging.INFO)
@@ -45,6 +48,7 @@ class UserDAL:
 
             hashed_password: str,
             roles: List[PortalRole],
+            avatar_sha256: Optional[str] = None,
 
     ) -> User:
         new_user = User(
@@ -56,6 +60,7 @@ class UserDAL:
             email=email,
             inn=inn,
             avatar=avatar,
+            avatar_sha256=avatar_sha256,
             job_title=job_title,
 
             hashed_password=hashed_password,
@@ -63,7 +68,7 @@ class UserDAL:
         )
         self.db_session.add(new_user)
         await self.db_session.flush()
-        await self.log_action(
+        self.log_action(
             user_id=new_user.user_id,
             action="Создание пользователя",
             name=new_user.name,
@@ -92,6 +97,7 @@ class UserDAL:
             deleted_user_id_row = result.fetchone()
             if deleted_user_id_row:
                 await self.db_session.commit()
+                token_cache.invalidate_user(user_id)
                 return deleted_user_id_row[0]
             else:
                 await self.db_session.rollback()
@@ -104,13 +110,14 @@ class UserDAL:
         user = await self.db_session.get(User, user_id)
         if user:
             user.is_active = False
-            await self.db_session.commit()
-            await self.log_action(
+            self.log_action(
                 user_id=user_id,
                 name=user.name,
                 action="User Disabled",
                 details=f"User with ID {user_id} was disabled",
             )
+            await self.db_session.commit()
+            token_cache.invalidate_user(user_id)
             return user_id
         return None
 
@@ -144,45 +151,91 @@ class UserDAL:
                 setattr(user, key, value)
             user.updated_at = datetime.utcnow()  # Обновляем дату изменения
 
-            # Сохранение изменений
-            await self.db_session.commit()  # Коммит транзакции
-            await self.log_action(
+            self.log_action(
                 user_id=user.user_id,
                 name=user.name,
                 action="Обновления пользователя",
                 details=f"Пользователь: {user.email} обновлён"
             )
+            # Сохранение изменений вместе с записью истории
+            await self.db_session.commit()  # Коммит транзакции
+            token_cache.invalidate_user(user_id)
 
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database update error: {str(e)}")
 
-    async def log_action(self, user_id: UUID, name: str, action: str, details: str):
-        try:
-            new_action = UserActionHistory(
-                user_id=user_id,
-                name=name,
-                action=action,
-                details=details,
+    def log_action(self, user_id: UUID, name: str, action: str, details: str) -> None:
+        """
+        Добавляет событие в историю действий. Событие записывается только
+        вместе с коммитом текущей транзакции (см. audit.record_action).
+        """
+        record_action(self.db_session, user_id=user_id, name=name, action=action, details=details)
+
+    @staticmethod
+    def _history_filters(
+            user_id: Optional[UUID] = None,
+            action: Optional[str] = None,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None,
+    ) -> list:
+        filters = []
+        if user_id is not None:
+            filters.append(UserActionHistory.user_id == user_id)
+        if action:
+            filters.append(UserActionHistory.action == action)
+        if since is not None:
+            filters.append(UserActionHistory.timestamp >= since)
+        if until is not None:
+            filters.append(UserActionHistory.timestamp < until)
+        return filters
+
+    async def get_history_page(
+            self,
+            limit: int,
+            cursor: Optional[str] = None,
+            user_id: Optional[UUID] = None,
+            action: Optional[str] = None,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None,
+    ) -> Tuple[List[UserActionHistory], Optional[str]]:
+        """
+        Страница истории действий от новых к старым (keyset по timestamp, id).
+        """
+        query = select(UserActionHistory).where(*self._history_filters(user_id, action, since, until))
+        if cursor:
+            timestamp, action_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+            query = query.where(
+                tuple_(UserActionHistory.timestamp, UserActionHistory.id) < tuple_(timestamp, action_id)
             )
-            self.db_session.add(new_action)
-            await self.db_session.commit()
-        except SQLAlchemyError as e:
-            logger.error(f"Error logging action: {e}", exc_info=True)
-            await self.db_session.rollback()
-            raise HTTPException(status_code=500, detail="Database error occurred while logging action")
-
-    async def get_all_history(self) -> List[ActionHistorySchema]:
+        query = query.order_by(UserActionHistory.timestamp.desc(), UserActionHistory.id.desc()).limit(limit + 1)
         try:
-            query = select(UserActionHistory)
             result = await self.db_session.execute(query)
-            history = result.scalars().all()
-            return [ActionHistorySchema.from_orm(action) for action in history]
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error occurred: {str(e)}")
-
-    async def get_user_history(self, user_id: UUID):
-        query = select(UserActionHistory).filter(UserActionHistory.user_id == user_id).order_by(
-            UserActionHistory.timestamp.desc())
-        result = await self.db_session.execute(query)
-        return result.scalars().all()
-
+        history = result.scalars().all()
+        next_cursor = None
+        if len(history) > limit:
+            history = history[:limit]
+            next_cursor = encode_cursor(history[-1].timestamp, history[-1].id)
+        return history, next_cursor
+
+    async def stream_history(
+            self,
+            user_id: Optional[UUID] = None,
+            action: Optional[str] = None,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None,
+            batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Построчно отдаёт историю через серверный курсор, не загружая таблицу в память.
+        """
+        query = (
+            select(UserActionHistory.__table__)
+            .where(*self._history_filters(user_id, action, since, until))
+            .order_by(UserActionHistory.timestamp, UserActionHistory.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db_session.stream(query)
+        async for row in result.mappings():
+            yield dict(row)
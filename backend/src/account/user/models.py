@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Boolean, Column, String, JSON, DateTime, Date, BigInteger, ForeignKey
+from sqlalchemy import Boolean, Column, String, JSON, DateTime, Date, BigInteger, ForeignKey, Index, text
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
@@ -27,6 +27,7 @@ class User(BaseUser):
 
     inn = Column(BigInteger, nullable=False)
     avatar = Column(String, nullable=True)
+    avatar_sha256 = Column(String(64), nullable=True)
     job_title = Column(String, nullable=False)
 
     is_active = Column(Boolean(), default=True)
@@ -38,6 +39,18 @@ class User(BaseUser):
 
     actions = relationship("UserActionHistory", back_populates="user")
 
+    __table_args__ = (
+        # Keyset-пагинация списков пользователей
+        Index("ix_users_created_at_user_id", "created_at", "user_id"),
+        Index("ix_users_active_created_at_user_id", "created_at", "user_id", postgresql_where=text("is_active")),
+        Index("ix_users_job_title", "job_title"),
+        Index("ix_users_roles", text("(roles::jsonb)"), postgresql_using="gin"),
+        # Поиск по подстроке (ILIKE) в имени, фамилии и email
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_surname_trgm", "surname", postgresql_using="gin", postgresql_ops={"surname": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
     @property
     def is_superadmin(self) -> bool:
         return PortalRole.ROLE_PORTAL_SUPERADMIN in self.roles
@@ -68,3 +81,8 @@ class UserActionHistory(BaseUser):
 
     user = relationship("User", back_populates="actions")
 
+    __table_args__ = (
+        Index("ix_user_action_history_user_id_timestamp", "user_id", text("timestamp DESC")),
+        Index("ix_user_action_history_timestamp_id", text("timestamp DESC"), text("id DESC")),
+    )
+
@@ -1,7 +1,7 @@
 import re
 import uuid
 
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date, datetime
 from fastapi import HTTPException
 from pydantic import BaseModel
@@ -9,6 +9,7 @@ from pydantic import EmailStr
 from pydantic import validator
 
 from backend.src.account.user.enums import PortalRole
+from backend.storage.thumbnails import thumbnail_urls
 
 LETTER_MATCH_PATTERN = re.compile(r"[a-zA-Zа-яА-Я\-]+$")
 
@@ -29,6 +30,9 @@ class ShowUser(TunedModel):
     email: EmailStr
     inn: Optional[int] = None
     avatar: Optional[str] = None
+    avatar_sha256: Optional[str] = None
+    # Размер.формат -> URL миниатюры, например "64.webp"
+    avatar_thumbnails: Dict[str, str] = {}
     job_title: Optional[str] = None
 
     is_active: bool
@@ -37,6 +41,10 @@ class ShowUser(TunedModel):
     created_at: datetime
     updated_at: datetime
 
+    @validator("avatar_thumbnails", always=True)
+    def fill_avatar_thumbnails(cls, value, values):
+        return value or thumbnail_urls(values.get("avatar_sha256"))
+
 
 class UserCreate(BaseModel):
     name: Optional[str] = None
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.config import settings
+from backend.db.batch import BatchWriter, BatchWriterFull, BatchWriterStopped
+from backend.src.chat.websocket import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBroker:
+    """
+    Доставка сообщений чата подключениям. Базовая реализация работает в
+    памяти процесса: сообщение сразу уходит в ConnectionManager. Подходит
+    для одного воркера и для тестов.
+    """
+
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def join(self, chat_id: int) -> None:
+        """
+        В процессе появилось подключение к комнате chat_id.
+        """
+
+    async def leave(self, chat_id: int) -> None:
+        """
+        Подключение к комнате chat_id закрыто.
+        """
+
+    def publish(self, chat_id: int, message: str) -> None:
+        self.connections.broadcast(chat_id, message)
+
+    def publish_to_user(self, user_id: str, message: str) -> None:
+        """
+        Личное сообщение во все подключения пользователя. Доставляется только
+        подключениям, открытым с токеном этого пользователя (см. ConnectionManager).
+        """
+        self.connections.send_to_user(user_id, message)
+
+
+class RedisChatBroker(ChatBroker):
+    """
+    Доставка между воркерами через Redis pub/sub: канал на комнату
+    ({prefix}:chat:room:{chat_id}) и каналы пользователей для личных
+    сообщений ({prefix}:chat:user:{user_id}, общая подписка по шаблону).
+    Кадр из канала пользователя получают только подключения, открытые с
+    токеном этого пользователя, в каком бы воркере они ни были.
+
+    Процесс подписан только на комнаты, к которым у него есть подключения.
+    Исходящие сообщения копятся BatchWriter-ом и публикуются одним
+    конвейером: сообщения одного канала за пачку уходят одним JSON-массивом.
+    При обрыве связи слушатель переподключается с экспоненциальной задержкой
+    и заново подписывается на все комнаты.
+    """
+
+    def __init__(self, connections: ConnectionManager, url: str, prefix: str):
+        super().__init__(connections)
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+        self._pubsub = None
+        self._rooms: Set[int] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self._writer = BatchWriter(
+            self._publish_batch,
+            max_batch_size=settings.CHAT_BROKER_BATCH_SIZE,
+            flush_interval=settings.CHAT_BROKER_FLUSH_INTERVAL,
+            name="chat-broker-publisher",
+            max_queue_size=settings.CHAT_BROKER_QUEUE_SIZE,
+        )
+
+    def _room_channel(self, chat_id: int) -> str:
+        return f"{self.prefix}:chat:room:{chat_id}"
+
+    def _user_channel(self, user_id: str) -> str:
+        return f"{self.prefix}:chat:user:{user_id}"
+
+    async def start(self) -> None:
+        from redis import asyncio as aioredis
+
+        self._redis = aioredis.from_url(self.url, decode_responses=True)
+        self._writer.start()
+        self._listener = asyncio.get_running_loop().create_task(self._listen(), name="chat-broker-listener")
+
+    async def stop(self) -> None:
+        await self._writer.stop()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def join(self, chat_id: int) -> None:
+        if chat_id in self._rooms:
+            return
+        self._rooms.add(chat_id)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.subscribe(self._room_channel(chat_id))
+            except Exception as e:
+                # Подписка восстановится при переподключении слушателя
+                logger.warning(f"Chat broker: subscribe to chat {chat_id} failed: {e}")
+
+    async def leave(self, chat_id: int) -> None:
+        if chat_id not in self._rooms or self.connections.room_size(chat_id):
+            return
+        self._rooms.discard(chat_id)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self._room_channel(chat_id))
+            except Exception as e:
+                logger.warning(f"Chat broker: unsubscribe from chat {chat_id} failed: {e}")
+
+    def publish(self, chat_id: int, message: str) -> None:
+        self._submit(self._room_channel(chat_id), message)
+
+    def publish_to_user(self, user_id: str, message: str) -> None:
+        self._submit(self._user_channel(user_id), message)
+
+    def _submit(self, channel: str, message: str) -> None:
+        try:
+            self._writer.submit_nowait((channel, message))
+        except (BatchWriterFull, BatchWriterStopped) as e:
+            # Сообщение уже в базе: клиенты получат его при догрузке истории
+            logger.warning(f"Chat broker: dropping frame for {channel}: {type(e).__name__}")
+
+    async def _publish_batch(self, batch: List[Tuple[str, str]]) -> None:
+        frames: Dict[str, List[str]] = {}
+        for channel, message in batch:
+            frames.setdefault(channel, []).append(message)
+        delay = 0.1
+        for attempt in range(settings.CHAT_BROKER_PUBLISH_RETRIES + 1):
+            try:
+                pipeline = self._redis.pipeline(transaction=False)
+                for channel, messages in frames.items():
+                    pipeline.publish(channel, json.dumps(messages, ensure_ascii=False))
+                await pipeline.execute()
+                return
+            except Exception as e:
+                if attempt == settings.CHAT_BROKER_PUBLISH_RETRIES:
+                    raise
+                logger.warning(f"Chat broker: publish failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    @staticmethod
+    def _decode(data: str) -> List[str]:
+        # Сообщение, опубликованное не брокером (например, из redis-cli), - один кадр
+        try:
+            frames = json.loads(data)
+        except ValueError:
+            return [data]
+        return frames if isinstance(frames, list) else [data]
+
+    async def _subscribe_all(self) -> None:
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(self._user_channel("*"))
+        if self._rooms:
+            await self._pubsub.subscribe(*map(self._room_channel, self._rooms))
+
+    async def _listen(self) -> None:
+        delay = 0.5
+        room_prefix = self._room_channel("")
+        user_prefix = self._user_channel("")
+        while True:
+            try:
+                await self._subscribe_all()
+                delay = 0.5
+                while True:
+                    message = await self._pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    channel = message["channel"]
+                    frames = self._decode(message["data"])
+                    if channel.startswith(room_prefix):
+                        chat_id = int(channel[len(room_prefix):])
+                        for frame in frames:
+                            self.connections.broadcast(chat_id, frame)
+                    elif channel.startswith(user_prefix):
+                        user_id = channel[len(user_prefix):]
+                        for frame in frames:
+                            self.connections.send_to_user(user_id, frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat broker: connection lost, reconnecting in {delay:.1f}s: {e}")
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.close()
+                    except Exception:
+                        pass
+                    self._pubsub = None
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.CHAT_BROKER_RECONNECT_MAX_DELAY)
+
+
+def create_broker(connections: ConnectionManager) -> ChatBroker:
+    """
+    redis - если CHAT_BROKER=redis или (по умолчанию) задан REDIS_URL,
+    иначе доставка в памяти процесса.
+    """
+    kind = settings.CHAT_BROKER or ("redis" if settings.REDIS_URL else "memory")
+    if kind == "redis":
+        if not settings.REDIS_URL:
+            raise RuntimeError("CHAT_BROKER=redis требует REDIS_URL")
+        return RedisChatBroker(connections, settings.REDIS_URL, settings.CACHE_PREFIX)
+    return ChatBroker(connections)
+
+
+broker = create_broker(manager)
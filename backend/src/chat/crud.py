@@ -1,8 +1,12 @@
+from fastapi import HTTPException
+from sqlalchemy import text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
-from backend.src.chat.models import Message, Chat
+from backend.cache.versions import resource_versions, CHATS
+from backend.db.pagination import encode_cursor, decode_cursor
+from backend.src.chat.models import MESSAGE_TIMESTAMP, Message, Chat
 from datetime import datetime
 
 from backend.src.chat.schemas import ChatCreate
@@ -17,6 +21,7 @@ async def create_chat(
     session.add(new_chat)
     await session.commit()
     await session.refresh(new_chat)
+    await resource_versions.bump(CHATS)
     return new_chat
 
 
@@ -36,6 +41,7 @@ async def create_message(
     sender_id: UUID,
     receiver_id: UUID,
     file_url: Optional[str] = None,
+    file_sha256: Optional[str] = None,
 ):
     new_message = Message(
         chat_id=chat_id,
@@ -43,30 +49,73 @@ async def create_message(
         sender_id=sender_id,
         receiver_id=receiver_id,
         file_url=file_url,
-        created_at=datetime.utcnow(),
+        file_sha256=file_sha256,
     )
     session.add(new_message)
+    # id и created_at возвращаются при flush (eager_defaults) - refresh не нужен
     await session.commit()
-    await session.refresh(new_message)
     return new_message
 
 
-async def get_all_messages(
-        session: AsyncSession,
-):
-    result = await session.execute(select(Message))
-    messages = result.scalars().all()
-    return messages
+MESSAGE_COLUMNS = (
+    Message.id, Message.chat_id, Message.sender_id, Message.receiver_id,
+    Message.content, Message.file_url, Message.file_sha256, Message.created_at,
+)
 
 
-# Функция для получения всех сообщений чата по message_id
-async def get_messages_by_chat_id(
-        message_id: int,
+async def get_messages_page(
         session: AsyncSession,
-):
-    query = select(Message).where(Message.id == message_id).order_by(Message.created_at)
-    result = await session.execute(query)
-    return result.scalars().all()
+        limit: int,
+        chat_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        since_id: Optional[int] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Страница истории сообщений (всех или одного чата) с keyset-пагинацией
+    по (created_at, id).
+
+    Обычный режим - от новых к старым; cursor продолжает листание в прошлое.
+    Режим since_id - сообщения после указанного, от старых к новым: клиент
+    догоняет пропущенное после переподключения. Следующая страница в этом
+    режиме запрашивается с since_id последнего полученного сообщения, он же
+    возвращается вместо курсора. При заданном chat_id since_id должен
+    принадлежать этому чату, иначе 404.
+
+    created_at ставит база при вставке, поэтому порядок ключей совпадает с
+    порядком записи, а не с моментом постановки в очередь. Остаётся окно между
+    вставкой и коммитом: пачка другого воркера, вставленная раньше, но
+    закоммиченная позже уже прочитанной страницы, в since-догрузку не попадёт.
+    Окно - время одной транзакции записи (миллисекунды); такие сообщения
+    клиент получает по websocket.
+    """
+    query = select(*MESSAGE_COLUMNS)
+    if chat_id is not None:
+        query = query.where(Message.chat_id == chat_id)
+    key = tuple_(Message.created_at, Message.id)
+
+    if since_id is not None:
+        # Якорь ищется только в запрошенном чате: чужой id не должен задавать
+        # точку отсчёта (и выдавать, существует ли такое сообщение)
+        anchor_query = select(Message.created_at, Message.id).where(Message.id == since_id)
+        if chat_id is not None:
+            anchor_query = anchor_query.where(Message.chat_id == chat_id)
+        anchor = (await session.execute(anchor_query)).one_or_none()
+        if anchor is None:
+            raise HTTPException(status_code=404, detail="Message not found in this chat")
+        query = query.where(key > tuple_(*anchor)).order_by(Message.created_at, Message.id)
+    else:
+        if cursor:
+            created_at, message_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            query = query.where(key < tuple_(created_at, message_id))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+    messages = [dict(row) for row in (await session.execute(query.limit(limit + 1))).mappings().all()]
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        next_cursor = str(last["id"]) if since_id is not None else encode_cursor(last["created_at"], last["id"])
+    return messages, next_cursor
 
 
 # Функция для получения конкретного сообщения по id
@@ -87,7 +136,7 @@ async def update_message_content(
     message = await get_message_by_id(session, message_id)
     if message:
         message.content = new_content
-        message.created_at = datetime.utcnow()
+        message.created_at = text(MESSAGE_TIMESTAMP)
         await session.commit()
         await session.refresh(message)
         return message
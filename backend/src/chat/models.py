@@ -1,8 +1,12 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Integer
+from sqlalchemy import Column, String, ForeignKey, DateTime, Text, Integer, Index, text
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 
+# Время сообщения ставит сервер БД в момент вставки (UTC без часового пояса,
+# как и остальные колонки DateTime), а не приложение до постановки в очередь
+MESSAGE_TIMESTAMP = "timezone('utc', clock_timestamp())"
+
 
 BaseChat = declarative_base()
 
@@ -28,5 +32,12 @@ class Message(BaseChat):
     receiver_id = Column(UUID, index=True)
     content = Column(Text)
     file_url = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
+    file_sha256 = Column(String(64), nullable=True)
+    created_at = Column(DateTime, server_default=text(MESSAGE_TIMESTAMP))
+
+    __table_args__ = (
+        # История чата листается от новых к старым по (created_at, id)
+        Index('ix_messages_chat_id_created_at', chat_id, created_at.desc(), id.desc()),
+    )
+    # created_at возвращается из INSERT ... RETURNING вместе с id
+    __mapper_args__ = {"eager_defaults": True}
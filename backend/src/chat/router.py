@@ -1,16 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, WebSocket
+import asyncio
+import logging
+
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi import status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from backend.db.session import get_db
+from backend.cache.etag import ConditionalGet
+from backend.cache.versions import CHATS
+from backend.config import settings
+from backend.db.batch import BatchWriterFull, BatchWriterStopped
+from backend.db.pagination import set_page_headers
+from backend.db.session import async_session_factory, get_db
+from backend.src.account.auth.jwt import get_current_user_from_token, get_principal_from_token
+from backend.src.account.auth.token_cache import UserPrincipal
+from backend.storage.uploads import save_upload
 from backend.src.chat.schemas import MessageResponse, ChatResponse, ChatCreate
-from backend.src.chat.crud import create_message, get_messages_by_chat_id, delete_message, update_message_content, \
-    create_chat, get_chat, get_all_messages
-from backend.src.chat.websocket import connect_to_websocket, broadcast_message, disconnect_from_websocket
+from backend.src.chat.schemas import WebSocketMessageIn, WebSocketAck, WebSocketError
+from backend.src.chat.crud import create_message, get_messages_page, delete_message, update_message_content, \
+    create_chat, get_chat
+from backend.src.chat.broker import broker
+from backend.src.chat.websocket import ChatConnection, manager
+from backend.src.chat.writer import submit_message
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+chats_etag = ConditionalGet(CHATS, cache_control=settings.CHATS_CACHE_CONTROL)
+
 
 @router.post("/create/chat/", response_model=ChatResponse)
 async def create_chat_endpoint(
@@ -24,6 +46,7 @@ async def create_chat_endpoint(
 @router.get("/get/chat/", response_model=List[ChatResponse])
 async def get_chat_all(
         session: AsyncSession = Depends(get_db),
+        versions: dict = Depends(chats_etag),
 ):
     all_chat = await get_chat(session)
     return all_chat
@@ -33,45 +56,67 @@ async def get_chat_all(
 async def create_chat_message(
     chat_id: int = Form(...),
     content: str = Form(None),
-    sender_id: UUID = Form(...),
     receiver_id: UUID = Form(...),
     file: UploadFile = File(None),
     session: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
 ):
-    file_url = None
+    """
+    Сообщение с вложением. Отправитель - владелец токена; сообщение уходит
+    в подключения получателя и отправителя (личные каналы брокера).
+    """
+    file_url = file_sha256 = None
     if file:
-        file_url = f"static/files/{file.filename}"
-        with open(file_url, "wb") as f:
-            f.write(await file.read())
+        stored = await save_upload(file, "files", max_size=settings.CHAT_ATTACHMENT_MAX_SIZE)
+        file_url, file_sha256 = stored.path, stored.sha256
 
     new_message = await create_message(
         session=session,
         chat_id=chat_id,
         content=content,
-        sender_id=sender_id,
+        sender_id=current_user.user_id,
         receiver_id=receiver_id,
         file_url=file_url,
-
+        file_sha256=file_sha256,
     )
+    # Получатель и другие подключения отправителя узнают о сообщении сразу
+    frame = MessageResponse.from_orm(new_message).json()
+    for user_id in {str(current_user.user_id), str(receiver_id)}:
+        broker.publish_to_user(user_id, frame)
     return new_message
 
 
 @router.get("/get_all/messages/", response_model=List[MessageResponse])
 async def get_messages_all(
+        response: Response,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
         session: AsyncSession = Depends(get_db),
 ):
-    all_messages = await get_all_messages(session)
-    return all_messages
+    messages, next_cursor = await get_messages_page(session, limit=limit, cursor=cursor)
+    set_page_headers(response, next_cursor)
+    return messages
 
 
 @router.get("/chats/{chat_id}/messages/", response_model=List[MessageResponse])
 async def get_chat_messages_id(
         chat_id: int,
+        response: Response,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        since_id: Optional[int] = None,
         session: AsyncSession = Depends(get_db),
 ):
-    messages = await get_messages_by_chat_id(chat_id, session)
-    if not messages:
+    """
+    История чата от новых к старым (X-Next-Cursor - курсор более старой
+    страницы) или, с since_id, сообщения после since_id от старых к новым.
+    """
+    messages, next_cursor = await get_messages_page(
+        session, limit=limit, chat_id=chat_id, cursor=cursor, since_id=since_id,
+    )
+    if not messages and cursor is None and since_id is None:
         raise HTTPException(status_code=404, detail="Messages not found")
+    set_page_headers(response, next_cursor)
     return messages
 
 
@@ -91,16 +136,93 @@ async def delete_chat_message(message_id: int, db: AsyncSession = Depends(get_db
     return deleted_message
 
 
+def _parse_frame(data: str) -> WebSocketMessageIn:
+    if data.lstrip().startswith("{"):
+        try:
+            return WebSocketMessageIn.parse_raw(data)
+        except ValidationError:
+            pass
+    return WebSocketMessageIn(content=data)
+
+
+def _on_message_saved(connection: ChatConnection, row: dict, client_id: Optional[str], future: asyncio.Future) -> None:
+    """
+    Сообщение записано (или нет): подтверждаем отправителю и рассылаем
+    сообщение с присвоенным id участникам комнаты. Личное сообщение (с
+    receiver_id) уходит только во все подключения отправителя и получателя.
+    """
+    if future.cancelled() or future.exception() is not None:
+        connection.offer(WebSocketError(detail="Сообщение не сохранено", client_id=client_id).json())
+        return
+    message_id, created_at = future.result()
+    message = MessageResponse(id=message_id, created_at=created_at, **row)
+    connection.offer(WebSocketAck(id=message.id, client_id=client_id).json())
+    if message.receiver_id is None:
+        broker.publish(connection.chat_id, message.json())
+        return
+    # Отправитель - проверенный владелец подключения, а не поле кадра
+    for user_id in {connection.user_id, str(message.receiver_id)}:
+        broker.publish_to_user(user_id, message.json())
+
+
+async def _authenticate_websocket(token: str) -> Optional[UserPrincipal]:
+    """
+    Пользователь по токену доступа из параметра подключения. Сессия БД нужна
+    только на проверку и не держится всё время жизни websocket.
+    """
+    async with async_session_factory() as session:
+        try:
+            principal = await get_principal_from_token(token, session)
+        except HTTPException:
+            return None
+    return principal if principal.is_active else None
+
+
 @router.websocket("/ws/chats/{chat_id}")
-async def websocket_endpoint(websocket: WebSocket, chat_id: int):
-    await websocket.accept()
-    await connect_to_websocket(websocket)
+async def websocket_endpoint(websocket: WebSocket, chat_id: int, token: Optional[str] = None):
+    """
+    Токен доступа передаётся параметром ?token=... (браузерный WebSocket не
+    умеет слать заголовок Authorization); отправитель сообщений - владелец
+    токена. Подключение с неверным токеном закрывается с кодом 1008, без
+    токена - только получает сообщения комнаты. Отправленные сообщения
+    пишутся в базу пачками; после записи отправитель получает подтверждение
+    с id, а комната - само сообщение (личное - только отправитель и получатель).
+    """
+    principal = None
+    if token is not None:
+        principal = await _authenticate_websocket(token)
+        if principal is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    connection = await manager.connect(websocket, chat_id, principal)
+    await broker.join(chat_id)
     try:
         while True:
-            data = await websocket.receive_text()  # Получаем данные
-            await broadcast_message(f"Chat {chat_id}: {data}")  # Отправляем всем клиентам
-            print(f"Broadcasting message: {chat_id}")
+            frame = _parse_frame(await websocket.receive_text())
+            if principal is None:
+                connection.offer(WebSocketError(
+                    detail="Для отправки сообщений нужен токен доступа", client_id=frame.client_id,
+                ).json())
+                continue
+            row = dict(
+                chat_id=chat_id,
+                sender_id=principal.user_id,
+                receiver_id=frame.receiver_id,
+                content=frame.content,
+                file_url=None,
+            )
+            try:
+                future = submit_message(row)
+            except (BatchWriterFull, BatchWriterStopped):
+                connection.offer(WebSocketError(
+                    detail="Сервер перегружен, сообщение не отправлено", client_id=frame.client_id,
+                ).json())
+                continue
+            future.add_done_callback(partial(_on_message_saved, connection, row, frame.client_id))
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"Ошибка: {e}")
+        logger.error(f"Chat {chat_id}: websocket error: {e}")
     finally:
-        await disconnect_from_websocket(websocket)
+        await manager.disconnect(connection)
+        await broker.leave(chat_id)
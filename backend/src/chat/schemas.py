@@ -34,9 +34,11 @@ class MessageCreate(BaseModel):
 class MessageResponse(BaseModel):
     id: int
     sender_id: uuid.UUID
-    receiver_id: uuid.UUID
+    # Сообщения в комнату по websocket адресованы всем участникам
+    receiver_id: Optional[uuid.UUID] = None
     content: str
     file_url: Optional[str] = None
+    file_sha256: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -48,3 +50,23 @@ class MessageUpdate(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class WebSocketMessageIn(BaseModel):
+    # Входящий кадр websocket: JSON-объект или просто текст сообщения
+    content: str
+    receiver_id: Optional[uuid.UUID] = None
+    # Произвольная метка клиента, возвращается в подтверждении
+    client_id: Optional[str] = None
+
+
+class WebSocketAck(BaseModel):
+    type: str = "ack"
+    id: int
+    client_id: Optional[str] = None
+
+
+class WebSocketError(BaseModel):
+    type: str = "error"
+    detail: str
+    client_id: Optional[str] = None
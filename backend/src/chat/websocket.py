@@ -1,23 +1,172 @@
+import asyncio
+import logging
+
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
 from fastapi import WebSocket
-from typing import List
+from prometheus_client import Counter, Gauge
+from starlette.websockets import WebSocketState
+
+from backend.config import settings
+from backend.src.account.auth.token_cache import UserPrincipal
+
+logger = logging.getLogger(__name__)
+
+CHAT_CONNECTIONS = Gauge(
+    "chat_websocket_connections",
+    "Open chat websocket connections per chat room",
+    ["chat_id"],
+)
+CHAT_SLOW_CONSUMERS = Counter(
+    "chat_websocket_slow_consumers_total",
+    "Chat websocket connections closed because their outbound queue overflowed",
+)
+
+# Код закрытия "Try Again Later": клиент не успевает читать сообщения
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+_CLOSE = object()
+
+
+class ChatConnection:
+    """
+    Подключение клиента к комнате чата. Исходящие сообщения кладутся в
+    ограниченную очередь и отправляются отдельной задачей, поэтому отправитель
+    никогда не ждёт медленного получателя.
+    """
+
+    def __init__(self, websocket: WebSocket, chat_id: int, principal: Optional[UserPrincipal], max_queue: int):
+        self.websocket = websocket
+        self.chat_id = chat_id
+        self.principal = principal
+        self.user_id = str(principal.user_id) if principal is not None else None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._pump(), name=f"chat-{self.chat_id}-sender")
+
+    def offer(self, message: str) -> bool:
+        """
+        Ставит сообщение в очередь отправки. False - очередь переполнена.
+        """
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _pump(self) -> None:
+        try:
+            while True:
+                message = await self._queue.get()
+                if message is _CLOSE:
+                    break
+                await asyncio.wait_for(self.websocket.send_text(message), settings.CHAT_SEND_TIMEOUT)
+        except Exception as e:
+            logger.info(f"Chat {self.chat_id}: sender stopped: {e!r}")
+            await self._close(SLOW_CONSUMER_CLOSE_CODE)
+
+    async def _close(self, code: int) -> None:
+        if self.websocket.application_state == WebSocketState.CONNECTED:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+
+    async def close(self, code: int = 1000) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._close(code)
+
+
+class ConnectionManager:
+    """
+    Активные websocket-подключения процесса, сгруппированные по chat_id и по
+    пользователю (для личных сообщений). В группу пользователя попадают только
+    подключения с проверенным токеном (UserPrincipal), поэтому чужие личные
+    сообщения нельзя получить, назвавшись чужим user_id. Рассылка стоит O(подключений
+    комнаты) неблокирующих put в очереди; подключение, очередь которого
+    переполнена, закрывается, а не тормозит остальных.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._rooms: Dict[int, Set[ChatConnection]] = defaultdict(set)
+        self._users: Dict[str, Set[ChatConnection]] = defaultdict(set)
+
+    def room_size(self, chat_id: int) -> int:
+        return len(self._rooms.get(chat_id, ()))
 
+    async def connect(
+            self,
+            websocket: WebSocket,
+            chat_id: int,
+            principal: Optional[UserPrincipal] = None,
+    ) -> ChatConnection:
+        await websocket.accept()
+        connection = ChatConnection(websocket, chat_id, principal, self.max_queue)
+        connection.start()
+        self._rooms[chat_id].add(connection)
+        if connection.user_id is not None:
+            self._users[connection.user_id].add(connection)
+        CHAT_CONNECTIONS.labels(chat_id=str(chat_id)).inc()
+        return connection
 
-active_connections: List[WebSocket] = []  # Для отслеживания активных соединений
+    async def disconnect(self, connection: ChatConnection) -> None:
+        if self._discard(connection):
+            await connection.close()
 
+    def _discard(self, connection: ChatConnection) -> bool:
+        room = self._rooms.get(connection.chat_id)
+        if room is None or connection not in room:
+            return False
+        room.discard(connection)
+        if not room:
+            del self._rooms[connection.chat_id]
+        if connection.user_id is not None:
+            user = self._users.get(connection.user_id)
+            if user is not None:
+                user.discard(connection)
+                if not user:
+                    del self._users[connection.user_id]
+        CHAT_CONNECTIONS.labels(chat_id=str(connection.chat_id)).dec()
+        return True
 
-# Функция для подключения WebSocket
-async def connect_to_websocket(websocket: WebSocket):
-    await websocket.accept()
-    active_connections.append(websocket)
+    def _deliver(self, connections: Iterable[ChatConnection], message: str) -> int:
+        delivered = 0
+        for connection in list(connections):
+            if connection.offer(message):
+                delivered += 1
+                continue
+            logger.warning(f"Chat {connection.chat_id}: closing slow consumer {connection.user_id}")
+            CHAT_SLOW_CONSUMERS.inc()
+            self._discard(connection)
+            asyncio.get_running_loop().create_task(connection.close(SLOW_CONSUMER_CLOSE_CODE))
+        return delivered
 
+    def broadcast(self, chat_id: int, message: str) -> int:
+        """
+        Рассылает сообщение подключениям комнаты, возвращает число получателей.
+        """
+        return self._deliver(self._rooms.get(chat_id, ()), message)
 
-# Функция для отключения WebSocket
-async def disconnect_from_websocket(websocket: WebSocket):
-    active_connections.remove(websocket)
+    def send_to_user(self, user_id: str, message: str) -> int:
+        """
+        Личное сообщение во все подключения пользователя (любые комнаты).
+        """
+        return self._deliver(self._users.get(user_id, ()), message)
 
+    async def close_all(self) -> None:
+        connections = [connection for room in self._rooms.values() for connection in room]
+        for connection in connections:
+            self._discard(connection)
+        await asyncio.gather(*(connection.close(1001) for connection in connections))
 
-# Функция для отправки сообщения всем подключенным клиентам
-async def broadcast_message(message: str):
-    for connection in active_connections:
-        await connection.send_text(message)
 
+manager = ConnectionManager(max_queue=settings.CHAT_OUTBOUND_QUEUE_SIZE)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from backend.config import settings
+from backend.db.batch import BatchWriter
+from backend.db.session import async_session_factory
+from backend.src.chat.models import Message
+
+logger = logging.getLogger(__name__)
+
+PendingMessage = Tuple[dict, asyncio.Future]
+
+
+SavedMessage = Tuple[int, datetime]
+
+
+async def _insert_messages(rows: List[dict]) -> List[SavedMessage]:
+    async with async_session_factory() as session:
+        statement = insert(Message).returning(Message.id, Message.created_at, sort_by_parameter_order=True)
+        saved = [tuple(row) for row in (await session.execute(statement, rows)).all()]
+        await session.commit()
+    return saved
+
+
+async def _write_message_batch(items: List[PendingMessage]) -> None:
+    """
+    Записывает пачку сообщений одним INSERT ... RETURNING и сообщает каждому
+    ожидающему (id, created_at) его сообщения. Если пачка не проходит по внешнему ключу
+    (например, чат удалён), сообщения записываются по одному, чтобы ошибка
+    досталась только своему отправителю.
+    """
+    try:
+        saved = await _insert_messages([row for row, _ in items])
+    except IntegrityError:
+        saved = None
+    except Exception as e:
+        for _, future in items:
+            if not future.done():
+                future.set_exception(e)
+        raise
+
+    if saved is not None:
+        for (_, future), result in zip(items, saved):
+            if not future.done():
+                future.set_result(result)
+        return
+
+    for row, future in items:
+        try:
+            result, = await _insert_messages([row])
+        except Exception as e:
+            logger.warning(f"Dropping chat message for chat {row['chat_id']}: {e}")
+            if not future.done():
+                future.set_exception(e)
+            continue
+        if not future.done():
+            future.set_result(result)
+
+
+message_writer = BatchWriter(
+    _write_message_batch,
+    max_batch_size=settings.CHAT_MESSAGE_BATCH_SIZE,
+    flush_interval=settings.CHAT_MESSAGE_FLUSH_INTERVAL,
+    name="chat-messages",
+    max_queue_size=settings.CHAT_MESSAGE_QUEUE_SIZE,
+)
+
+
+def submit_message(row: dict) -> asyncio.Future:
+    """
+    Ставит сообщение (значения колонок Message без created_at) в очередь
+    записи. Future получает (id, created_at) записанного сообщения или
+    исключение записи. Если очередь
+    переполнена или запись остановлена, BatchWriterFull / BatchWriterStopped
+    выбрасываются сразу.
+    """
+    future = asyncio.get_running_loop().create_future()
+    message_writer.submit_nowait((row, future))
+    return future
@@ -1,9 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import Union
+from typing import Optional, Union
 from fastapi import HTTPException
 
+from backend.cache.reference import reference_cache, DEPARTMENTS
+from backend.config import settings
 from backend.src.departments.schemas import DepartmentSchemas
+from backend.src.departments.schemas import DepartmentOUT
 from backend.src.departments.schemas import DepartmentCreate
 from backend.src.departments.schemas import DepartmentUpdate
 from backend.src.departments.models import Departments
@@ -17,19 +20,24 @@ async def _create_department(
     session.add(db_departments)
     await session.commit()
     await session.refresh(db_departments)
+    await reference_cache.invalidate(DEPARTMENTS)
     return db_departments
 
 
-async def _get_all_department(session: AsyncSession):
-    result = await session.execute(select(Departments))
-    departments = result.scalars().all()
-    return departments
+async def _load_departments(session: AsyncSession):
+    result = await session.execute(select(Departments).order_by(Departments.id))
+    return [DepartmentOUT.from_orm(department) for department in result.scalars().all()]
 
 
-async def _get_is_active(session: AsyncSession):
-    query = select(Departments).where(Departments.is_active == True)
-    res = await session.execute(query)
-    return res.scalars().all()
+async def _get_all_department(session: AsyncSession, version: Optional[str] = None):
+    return await reference_cache.get_or_load(
+        DEPARTMENTS, lambda: _load_departments(session), ttl=settings.DEPARTMENTS_CACHE_TTL, version=version,
+    )
+
+
+async def _get_is_active(session: AsyncSession, version: Optional[str] = None):
+    departments = await _get_all_department(session, version)
+    return [department for department in departments if department["is_active"]]
 
 
 async def _get_department_by_id(
@@ -57,6 +65,7 @@ async def _update_department(
     session.add(db_department)
     await session.commit()
     await session.refresh(db_department)
+    await reference_cache.invalidate(DEPARTMENTS)
     return db_department
 
 
@@ -69,6 +78,7 @@ async def _delete_department(
         raise HTTPException(status_code=404, detail="Департамент не найден")
     await session.delete(db_department)
     await session.commit()
+    await reference_cache.invalidate(DEPARTMENTS)
     return db_department
 
 
@@ -85,6 +95,7 @@ async def _disable_department(
 
     db_department.is_active = False
     await session.commit()
+    await reference_cache.invalidate(DEPARTMENTS)
     return db_department
 
 
@@ -6,6 +6,9 @@ from fastapi import HTTPException
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.cache.etag import ConditionalGet
+from backend.cache.versions import DEPARTMENTS
+from backend.config import settings
 from backend.src.account.user.dals import User
 from backend.src.account.auth.jwt import get_current_user_from_token
 from backend.db.session import get_db
@@ -25,6 +28,8 @@ from backend.src.departments.crud import _disable_department
 
 router = APIRouter()
 
+departments_etag = ConditionalGet(DEPARTMENTS, cache_control=settings.REFERENCE_CACHE_CONTROL)
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(filename='log/departments.log', level=logging.INFO)
 
@@ -44,10 +49,11 @@ async def create_departments(
 async def read_departments(
         session: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token),
+        versions: dict = Depends(departments_etag),
 ):
     logger.info("Получен запрос на получение всех департаментов")
 
-    all_departments = await _get_all_department(session)
+    all_departments = await _get_all_department(session, versions[DEPARTMENTS])
     return all_departments
 
 
@@ -55,10 +61,11 @@ async def read_departments(
 async def read_active_departments(
         session: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token),
+        versions: dict = Depends(departments_etag),
 ):
     logger.info("Получен запрос на получение активных департаментов")
 
-    is_active_department = await _get_is_active(session)
+    is_active_department = await _get_is_active(session, versions[DEPARTMENTS])
     return is_active_department
 
 
@@ -1,18 +1,42 @@
 import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
+from pydantic import ValidationError
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy import delete
+from sqlalchemy import func, insert, literal, or_, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from fastapi import HTTPException
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from backend.cache.reference import reference_cache, CATEGORIES, TYPE_SELECTIONS
+from backend.db.pagination import encode_cursor, decode_cursor
+from backend.cache.versions import resource_versions, QUESTIONS
+from backend.config import settings
 from backend.src.ekzamens.models import Question, Answer, Category, TypeSelection
+from backend.src.ekzamens.models import ExamTicket, ExamTicketQuestion, ExamResult
+from backend.src.ekzamens.models import ExamQuestionStats, ExamAnswerStats, ExamCategoryStats
 from backend.src.ekzamens.schemas import AnswerCreate, AnswerUpdate
 from backend.src.ekzamens.schemas import QuestionCreate, QuestionUpdate
 from backend.src.ekzamens.schemas import CategoryCreate, CategoryUpdate, CategoryDelete
 from backend.src.ekzamens.schemas import TypeSelectionCreate, TypeSelectionUpdate
+from backend.src.ekzamens.schemas import CategorySchema, TypeSelectionSchema
+from backend.src.ekzamens.schemas import QuestionImportRow, QuestionImportError, QuestionImportResult
+from backend.src.ekzamens.schemas import ExamTicketCreate, ExamTicketOUT, TicketQuestionOUT, TicketAnswerOUT
+from backend.src.ekzamens.importer import ImportRow
+from backend.src.ekzamens.schemas import BulkExamSubmission, ExamResultOUT, BulkGradeError, BulkGradeResult
+from backend.src.ekzamens.grading import answer_key_cache, grade_ticket, selected_by_question, unpack_bitmap
+from backend.src.ekzamens.schemas import QuestionStatsOUT, AnswerStatsOUT, CategoryStatsOUT
+from backend.src.ekzamens.schemas import AnswerOUTPUT, QuestionCreateOUT, QuestionSearchOUT, SimilarQuestionOUT
+from backend.src.ekzamens.pool import question_pool
+from backend.src.ekzamens.stats import apply_stats_delta, collect_stats, question_report
 
 
 ##########################
@@ -28,13 +52,19 @@ async def _create_category(
     session.add(db_category)
     await session.commit()
     await session.refresh(db_category)
+    await reference_cache.invalidate(CATEGORIES)
     return db_category
 
 
-async def _get_all_categories(session: AsyncSession):
-    result = await session.execute(select(Category))
-    categories = result.scalars().all()
-    return categories
+async def _load_categories(session: AsyncSession):
+    result = await session.execute(select(Category).order_by(Category.id))
+    return [CategorySchema.from_orm(category) for category in result.scalars().all()]
+
+
+async def _get_all_categories(session: AsyncSession, version: Optional[str] = None):
+    return await reference_cache.get_or_load(
+        CATEGORIES, lambda: _load_categories(session), ttl=settings.CATEGORIES_CACHE_TTL, version=version,
+    )
 
 
 async def _get_category_by_id(
@@ -57,6 +87,7 @@ async def _update_category(
         raise HTTPException(status_code=404, detail="Category not found")
     db_category.title = body.title
     await session.commit()
+    await reference_cache.invalidate(CATEGORIES)
     return db_category
 
 
@@ -69,6 +100,7 @@ async def _delete_category(
         raise HTTPException(status_code=404, detail="Category not found")
     await session.delete(db_category)
     await session.commit()
+    await reference_cache.invalidate(CATEGORIES)
     return db_category
 
 
@@ -85,13 +117,20 @@ async def _create_type_selection(
     session.add(db_type_selection)
     await session.commit()
     await session.refresh(db_type_selection)
+    await reference_cache.invalidate(TYPE_SELECTIONS)
     return db_type_selection
 
 
-async def _get_type_selection(session: AsyncSession):
-    result = await session.execute(select(TypeSelection))
-    type_selections = result.scalars().all()
-    return type_selections
+async def _load_type_selections(session: AsyncSession):
+    result = await session.execute(select(TypeSelection).order_by(TypeSelection.id))
+    return [TypeSelectionSchema.from_orm(type_selection) for type_selection in result.scalars().all()]
+
+
+async def _get_type_selection(session: AsyncSession, version: Optional[str] = None):
+    return await reference_cache.get_or_load(
+        TYPE_SELECTIONS, lambda: _load_type_selections(session), ttl=settings.TYPE_SELECTIONS_CACHE_TTL,
+        version=version,
+    )
 
 
 async def _get_type_selections_by_id(
@@ -114,6 +153,7 @@ async def _update_type_selection(
         raise HTTPException(status_code=404, detail="Type Selection not found")
     db_type_selection.title = body.title
     await session.commit()
+    await reference_cache.invalidate(TYPE_SELECTIONS)
     return db_type_selection
 
 
@@ -126,6 +166,7 @@ async def _delete_type_selection(
         raise HTTPException(status_code=404, detail="Type Selection not found")
     await session.delete(db_type_selection)
     await session.commit()
+    await reference_cache.invalidate(TYPE_SELECTIONS)
     return db_type_selection
 
 
@@ -140,6 +181,7 @@ async def _create_answer(
     session.add(db_answer)
     await session.commit()
     await session.refresh(db_answer)
+    await resource_versions.bump(QUESTIONS)
     return db_answer
 
 
@@ -166,34 +208,156 @@ async def _get_answer_by_id(
 async def _create_question(
         body: QuestionCreate,
         session: AsyncSession
-):
+) -> QuestionCreateOUT:
+    """
+    Создаёт вопрос вместе с ответами одним коммитом. В ответе перечисляются
+    уже существующие похожие вопросы, чтобы редактор мог заметить дубликат.
+    """
+    similar = await _find_similar_questions(body.title, session)
+
+    now = datetime.utcnow()
     db_question = Question(
+        question_id=uuid.uuid4(),
         title=body.title,
         category_id=body.category_id,
-        type_select_id=body.type_select_id
+        type_select_id=body.type_select_id,
+        created_at=now,
+    )
+    answers = [
+        Answer(
+            id=uuid.uuid4(),
+            text=answer_data.text,
+            is_correct=answer_data.is_correct,
+            question_id=db_question.question_id,
+            created_at=now,
+        )
+        for answer_data in body.answers
+    ]
+    session.add(db_question)
+    session.add_all(answers)
+    await session.commit()
+    set_committed_value(db_question, "answers", answers)
+
+    await resource_versions.bump(QUESTIONS)
+    return QuestionCreateOUT(
+        question_id=db_question.question_id,
+        title=db_question.title,
+        category_id=db_question.category_id,
+        type_select_id=db_question.type_select_id,
+        answers=[AnswerOUTPUT(id=answer.id, text=answer.text, is_correct=answer.is_correct) for answer in answers],
+        similar=similar,
     )
 
-    session.add(db_question)  # Добавляем вопрос в сессию
-    await session.commit()  # Сохраняем вопрос в базе данных
-    await session.refresh(db_question)  # Обновляем объект, чтобы получить его идентификатор
 
-    if body.answers:
-        for answer_data in body.answers:
-            db_answer = Answer(
-                text=answer_data.text,
-                is_correct=answer_data.is_correct,
-                question_id=db_question.question_id
-            )
-            session.add(db_answer)
-        await session.commit()  # Сохраняем ответы в базе данных
+async def _find_similar_questions(
+        title: str,
+        session: AsyncSession,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+) -> List[SimilarQuestionOUT]:
+    """
+    Похожие по тексту вопросы (триграммное сходство pg_trgm не ниже threshold).
+    Оператор % использует GIN-индекс ix_questions_title_trgm; порог задаётся
+    на время текущей транзакции.
+    """
+    if threshold is None:
+        threshold = settings.QUESTION_DUPLICATE_THRESHOLD
+    await session.execute(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+    similarity = func.similarity(Question.title, title)
+    query = (
+        select(Question.question_id, Question.title, similarity.label("similarity"))
+        .where(Question.title.op("%")(title))
+        .order_by(similarity.desc())
+        .limit(limit)
+    )
+    return [
+        SimilarQuestionOUT(question_id=question_id, title=similar_title, similarity=score)
+        for question_id, similar_title, score in (await session.execute(query)).all()
+    ]
 
-    return db_question
 
+async def _search_questions(
+        q: str,
+        session: AsyncSession,
+        limit: int,
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+) -> List[QuestionSearchOUT]:
+    """
+    Полнотекстовый поиск по тексту вопросов и ответов. Запрос разбирается
+    websearch_to_tsquery в конфигурациях russian и simple; совпадение в
+    ответах весит вдвое меньше совпадения в самом вопросе.
+    """
+    tsquery = func.websearch_to_tsquery("russian", q).op("||")(func.websearch_to_tsquery("simple", q))
+    answer_hits = (
+        select(Answer.question_id, func.max(func.ts_rank(Answer.search_vector, tsquery)).label("rank"))
+        .where(Answer.search_vector.op("@@")(tsquery))
+        .group_by(Answer.question_id)
+        .subquery()
+    )
+    rank = func.ts_rank(Question.search_vector, tsquery) + func.coalesce(answer_hits.c.rank, 0) * 0.5
+    query = (
+        select(
+            Question.question_id, Question.title, Question.category_id, Question.type_select_id,
+            rank.label("rank"),
+        )
+        .outerjoin(answer_hits, answer_hits.c.question_id == Question.question_id)
+        .where(or_(Question.search_vector.op("@@")(tsquery), answer_hits.c.question_id.isnot(None)))
+    )
+    if category_id is not None:
+        query = query.where(Question.category_id == category_id)
+    if type_select_id is not None:
+        query = query.where(Question.type_select_id == type_select_id)
+    query = query.order_by(rank.desc(), Question.question_id).limit(limit)
+    return [QuestionSearchOUT(**row) for row in (await session.execute(query)).mappings().all()]
 
-async def _get_question(session: AsyncSession):
-    result = await session.execute(select(Question).options(selectinload(Question.answers)))
-    questions = result.scalars().all()
-    return questions
+
+async def _get_questions_page(
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+        include_answers: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Страница вопросов с keyset-пагинацией по (created_at, question_id).
+
+    Только для чтения: выбираются нужные столбцы (без ORM-объектов и identity
+    map), ответ собирается из словарей. Ответы загружаются вторым запросом
+    только при include_answers. Возвращает вопросы и курсор следующей страницы.
+    """
+    query = select(
+        Question.question_id, Question.title, Question.category_id, Question.type_select_id, Question.created_at,
+    )
+    if category_id is not None:
+        query = query.where(Question.category_id == category_id)
+    if type_select_id is not None:
+        query = query.where(Question.type_select_id == type_select_id)
+    if cursor:
+        created_at, question_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+        query = query.where(tuple_(Question.created_at, Question.question_id) > tuple_(created_at, question_id))
+    query = query.order_by(Question.created_at, Question.question_id).limit(limit + 1)
+
+    questions = [dict(row) for row in (await session.execute(query)).mappings().all()]
+    next_cursor = None
+    if len(questions) > limit:
+        questions = questions[:limit]
+        next_cursor = encode_cursor(questions[-1]["created_at"], questions[-1]["question_id"])
+
+    if include_answers and questions:
+        by_id = {}
+        for question in questions:
+            question["answers"] = []
+            by_id[question["question_id"]] = question["answers"]
+        answer_query = (
+            select(Answer.question_id, Answer.id, Answer.text, Answer.is_correct)
+            .where(Answer.question_id.in_(list(by_id)))
+            .order_by(Answer.created_at)
+        )
+        for question_id, answer_id, text, is_correct in (await session.execute(answer_query)).all():
+            by_id[question_id].append({"id": answer_id, "text": text, "is_correct": is_correct})
+    return questions, next_cursor
 
 
 async def _get_question_by_id(
@@ -222,20 +386,30 @@ async def _update_question(
     db_question.type_select_id = body.type_select_id
 
     # Обновляем ответы
+    new_answers = None
     if body.answers:
         # Удаляем старые ответы
         await session.execute(delete(Answer).where(Answer.question_id == question_id))
         # Добавляем новые ответы
-        for answer_data in body.answers:
-            db_answer = Answer(
+        now = datetime.utcnow()
+        new_answers = [
+            Answer(
+                id=uuid.uuid4(),
                 text=answer_data.text,
                 is_correct=answer_data.is_correct,
-                question_id=question_id
+                question_id=question_id,
+                created_at=now,
             )
-            session.add(db_answer)
+            for answer_data in body.answers
+        ]
+        session.add_all(new_answers)
 
     await session.commit()
-    await session.refresh(db_question)
+    if new_answers is not None:
+        # Все значения известны заранее, поэтому вместо refresh (повторного
+        # чтения вопроса и ответов) коллекция подменяется уже записанными ответами
+        set_committed_value(db_question, "answers", new_answers)
+    await resource_versions.bump(QUESTIONS)
     return db_question
 
 
@@ -254,4 +428,472 @@ async def _delete_question(
     await session.execute(delete(Question).where(Question.question_id == question_id))
 
     await session.commit()
+    await resource_versions.bump(QUESTIONS)
     return db_question
+
+
+##########################
+#    QUESTION IMPORT     #
+##########################
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _resolve_import_references(
+        rows: List[QuestionImportRow],
+        session: AsyncSession,
+) -> Dict[str, Dict]:
+    """
+    Одним запросом находит категории и типы выборки, упомянутые в импорте
+    по id или по названию.
+    """
+    category_ids = {row.category_id for row in rows if row.category_id is not None}
+    category_titles = {row.category for row in rows if row.category}
+    type_ids = {row.type_select_id for row in rows if row.type_select_id is not None}
+    type_titles = {row.type_select for row in rows if row.type_select}
+
+    query = union_all(
+        select(literal("category").label("kind"), Category.id, Category.title)
+        .where(or_(Category.id.in_(category_ids), Category.title.in_(category_titles))),
+        select(literal("type_select").label("kind"), TypeSelection.id, TypeSelection.title)
+        .where(or_(TypeSelection.id.in_(type_ids), TypeSelection.title.in_(type_titles))),
+    )
+    references = {
+        "category": {"ids": set(), "titles": {}},
+        "type_select": {"ids": set(), "titles": {}},
+    }
+    for kind, reference_id, title in (await session.execute(query)).all():
+        references[kind]["ids"].add(reference_id)
+        references[kind]["titles"][title] = reference_id
+    return references
+
+
+def _resolve_reference(kind: str, reference_id: Optional[int], title: Optional[str], references, errors) -> Optional[int]:
+    known = references[kind]
+    if reference_id is not None and reference_id not in known["ids"]:
+        errors.append(f"{kind}_id: {reference_id} не найден")
+        return None
+    if title:
+        resolved = known["titles"].get(title)
+        if resolved is None:
+            errors.append(f"{kind}: {title!r} не найден")
+            return None
+        if reference_id is not None and reference_id != resolved:
+            errors.append(f"{kind}: {title!r} не совпадает с {kind}_id={reference_id}")
+            return None
+        return resolved
+    return reference_id
+
+
+async def _import_questions(
+        rows: List[ImportRow],
+        session: AsyncSession,
+        partial: bool = False,
+) -> QuestionImportResult:
+    """
+    Массовый импорт вопросов с ответами.
+
+    Все строки проверяются до записи; категории и типы выборки разрешаются
+    одним запросом. Вопросы и ответы вставляются многострочными
+    INSERT ... RETURNING пачками по QUESTION_IMPORT_CHUNK_SIZE в одной
+    транзакции. Если есть ошибочные строки и partial=False, ничего не
+    записывается (422 со списком ошибок по строкам); при partial=True
+    записываются только корректные строки.
+    """
+    if len(rows) > settings.QUESTION_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Не больше {settings.QUESTION_IMPORT_MAX_ROWS} вопросов за один импорт",
+        )
+
+    errors: Dict[int, List[str]] = {}
+    parsed = []
+    for row in rows:
+        row_errors = list(row.errors)
+        try:
+            question = QuestionImportRow.parse_obj(row.data)
+        except ValidationError as e:
+            row_errors.extend(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            question = None
+        if question is not None:
+            question.title = question.title.strip()
+            if not question.title:
+                row_errors.append("title: пустой текст вопроса")
+            if not question.answers:
+                row_errors.append("answers: нет ни одного ответа")
+            elif not any(answer.is_correct for answer in question.answers):
+                row_errors.append("answers: нет верного ответа")
+        if row_errors:
+            errors[row.row] = row_errors
+        else:
+            parsed.append((row.row, question))
+
+    references = await _resolve_import_references([question for _, question in parsed], session)
+
+    now = datetime.utcnow()
+    question_values = []
+    answer_values = []
+    for number, question in parsed:
+        row_errors = []
+        category_id = _resolve_reference("category", question.category_id, question.category, references, row_errors)
+        type_select_id = _resolve_reference(
+            "type_select", question.type_select_id, question.type_select, references, row_errors,
+        )
+        if row_errors:
+            errors[number] = row_errors
+            continue
+        question_id = uuid.uuid4()
+        question_values.append(dict(
+            question_id=question_id,
+            title=question.title,
+            category_id=category_id,
+            type_select_id=type_select_id,
+            created_at=now,
+        ))
+        answer_values.extend(
+            dict(id=uuid.uuid4(), text=answer.text, is_correct=answer.is_correct, question_id=question_id, created_at=now)
+            for answer in question.answers
+        )
+
+    import_errors = [QuestionImportError(row=number, errors=errors[number]) for number in sorted(errors)]
+    if import_errors and not partial:
+        raise HTTPException(status_code=422, detail=[error.dict() for error in import_errors])
+
+    question_ids = []
+    if question_values:
+        for chunk in _chunks(question_values, settings.QUESTION_IMPORT_CHUNK_SIZE):
+            result = await session.execute(insert(Question).values(chunk).returning(Question.question_id))
+            question_ids.extend(result.scalars().all())
+        for chunk in _chunks(answer_values, settings.QUESTION_IMPORT_CHUNK_SIZE):
+            await session.execute(insert(Answer).values(chunk))
+        await session.commit()
+        await resource_versions.bump(QUESTIONS)
+
+    return QuestionImportResult(created=len(question_ids), question_ids=question_ids, errors=import_errors)
+
+
+##########################
+#      EXAM TICKETS      #
+##########################
+
+
+async def _load_ticket_questions(
+        question_ids: List[UUID],
+        session: AsyncSession,
+) -> Dict[UUID, Question]:
+    query = select(Question).where(Question.question_id.in_(question_ids)).options(selectinload(Question.answers))
+    result = await session.execute(query)
+    return {question.question_id: question for question in result.scalars().all()}
+
+
+def _ticket_out(ticket: ExamTicket, questions: Dict[UUID, Question]) -> ExamTicketOUT:
+    """
+    Билет для выдачи экзаменуемому: ответы в сохранённом порядке, без is_correct.
+    """
+    items = []
+    for item in ticket.questions:
+        question = questions.get(item.question_id)
+        answers = {str(answer.id): answer for answer in question.answers} if question else {}
+        items.append(TicketQuestionOUT(
+            position=item.position,
+            question_id=item.question_id,
+            title=question.title if question else None,
+            answers=[
+                TicketAnswerOUT(id=answers[answer_id].id, text=answers[answer_id].text)
+                for answer_id in item.answer_order if answer_id in answers
+            ],
+        ))
+    return ExamTicketOUT(
+        ticket_id=ticket.ticket_id,
+        user_id=ticket.user_id,
+        category_id=ticket.category_id,
+        type_select_id=ticket.type_select_id,
+        created_at=ticket.created_at,
+        questions=items,
+    )
+
+
+async def _create_ticket(
+        body: ExamTicketCreate,
+        user_id: UUID,
+        session: AsyncSession,
+) -> ExamTicketOUT:
+    count = body.question_count or settings.EXAM_TICKET_SIZE
+    if not 1 <= count <= settings.EXAM_TICKET_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Количество вопросов должно быть от 1 до {settings.EXAM_TICKET_MAX_SIZE}",
+        )
+    try:
+        question_ids = await question_pool.sample(session, body.category_id, body.type_select_id, count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    questions = await _load_ticket_questions(question_ids, session)
+    if any(question_id not in questions for question_id in question_ids):
+        # Вопрос удалили между обновлением пула и выдачей билета
+        raise HTTPException(status_code=409, detail="Банк вопросов изменился, повторите попытку")
+
+    ticket = ExamTicket(
+        ticket_id=uuid.uuid4(),
+        user_id=user_id,
+        category_id=body.category_id,
+        type_select_id=body.type_select_id,
+        created_at=datetime.utcnow(),
+    )
+    for position, question_id in enumerate(question_ids, start=1):
+        answers = questions[question_id].answers
+        answer_order = question_pool.shuffle([str(answer.id) for answer in answers])
+        ticket.questions.append(ExamTicketQuestion(
+            position=position,
+            question_id=question_id,
+            answer_order=answer_order,
+            correct_answers=sorted(str(answer.id) for answer in answers if answer.is_correct),
+        ))
+    session.add(ticket)
+    await session.commit()
+    return _ticket_out(ticket, questions)
+
+
+async def _get_ticket(
+        ticket_id: UUID,
+        session: AsyncSession,
+) -> Optional[ExamTicket]:
+    query = select(ExamTicket).where(ExamTicket.ticket_id == ticket_id).options(selectinload(ExamTicket.questions))
+    result = await session.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def _get_ticket_out(
+        ticket: ExamTicket,
+        session: AsyncSession,
+) -> ExamTicketOUT:
+    question_ids = [item.question_id for item in ticket.questions if item.question_id is not None]
+    questions = await _load_ticket_questions(question_ids, session)
+    return _ticket_out(ticket, questions)
+
+
+##########################
+#        GRADING         #
+##########################
+
+
+def _result_out(result: ExamResult) -> ExamResultOUT:
+    return ExamResultOUT(
+        ticket_id=result.ticket_id,
+        user_id=result.user_id,
+        total=result.total,
+        correct_count=result.correct_count,
+        score_percent=result.score_percent,
+        passed=result.passed,
+        submitted_at=result.submitted_at,
+        correct=unpack_bitmap(result.correct_bitmap, result.positions),
+    )
+
+
+async def _grade_submissions(
+        submissions: List[BulkExamSubmission],
+        session: AsyncSession,
+        user_id: Optional[UUID] = None,
+) -> Tuple[List[ExamResult], List[Tuple[UUID, int, str]]]:
+    """
+    Оценивает пачку сданных билетов: билеты, уже сохранённые результаты и
+    ключи ответов загружаются одним запросом каждый, результаты записываются
+    одним многострочным INSERT ... ON CONFLICT DO NOTHING. Если передан user_id, принимаются только
+    билеты этого пользователя.
+
+    Вопросы, удалённые после выдачи билета, в оценку не входят: процент
+    считается от оставшихся (см. grade_ticket).
+
+    Возвращает сохранённые результаты и ошибки (ticket_id, HTTP-статус, текст).
+    """
+    ticket_ids = {submission.ticket_id for submission in submissions}
+    query = select(ExamTicket).where(ExamTicket.ticket_id.in_(ticket_ids)).options(selectinload(ExamTicket.questions))
+    tickets = {str(ticket.ticket_id): ticket for ticket in (await session.execute(query)).scalars().all()}
+    graded = {
+        str(ticket_id) for ticket_id in
+        (await session.execute(select(ExamResult.ticket_id).where(ExamResult.ticket_id.in_(ticket_ids)))).scalars()
+    }
+    # Ключ из кэша нужен только билетам, выданным без снимка верных ответов
+    keys = await answer_key_cache.get_many(
+        {
+            item.question_id for ticket in tickets.values() for item in ticket.questions
+            if item.question_id is not None and item.correct_answers is None
+        },
+        session,
+    )
+
+    now = datetime.utcnow()
+    results = []
+    graded_tickets = []
+    errors = []
+    for submission in submissions:
+        ticket_id = str(submission.ticket_id)
+        ticket = tickets.get(ticket_id)
+        if ticket is None:
+            errors.append((submission.ticket_id, 404, "Билет не найден"))
+            continue
+        if user_id is not None and str(ticket.user_id) != str(user_id):
+            errors.append((submission.ticket_id, 403, "Forbidden"))
+            continue
+        if ticket_id in graded:
+            errors.append((submission.ticket_id, 409, "Билет уже сдан"))
+            continue
+        graded.add(ticket_id)
+
+        outcome = grade_ticket(ticket, selected_by_question(submission.answers), keys)
+        score_percent = round(100.0 * outcome.correct_count / outcome.total, 2) if outcome.total else 0.0
+        results.append(ExamResult(
+            ticket_id=ticket.ticket_id,
+            user_id=ticket.user_id,
+            category_id=ticket.category_id,
+            type_select_id=ticket.type_select_id,
+            total=outcome.total,
+            positions=outcome.positions,
+            correct_count=outcome.correct_count,
+            score_percent=score_percent,
+            passed=score_percent >= settings.EXAM_PASS_PERCENT,
+            correct_bitmap=outcome.correct_bitmap,
+            selected=outcome.selected,
+            submitted_at=now,
+        ))
+        graded_tickets.append(ticket)
+
+    if results:
+        columns = [column.key for column in ExamResult.__table__.columns]
+        # Билет, сданный параллельным запросом после проверки выше, не
+        # вставляется и получает свою 409; остальные билеты пачки сохраняются
+        statement = (
+            pg_insert(ExamResult)
+            .values([{key: getattr(result, key) for key in columns} for result in results])
+            .on_conflict_do_nothing(index_elements=["ticket_id"])
+            .returning(ExamResult.ticket_id)
+        )
+        inserted = {str(ticket_id) for ticket_id in (await session.execute(statement)).scalars()}
+        saved = [(ticket, result) for ticket, result in zip(graded_tickets, results) if str(result.ticket_id) in inserted]
+        for result in results:
+            if str(result.ticket_id) not in inserted:
+                errors.append((result.ticket_id, 409, "Билет уже сдан"))
+
+        # Ответы, удалённые правкой вопроса после выдачи билета, в статистику
+        # не попадают; оставшиеся блокируются от удаления до коммита
+        selected_ids = {
+            answer_id for _, result in saved for answer_ids in result.selected.values() for answer_id in answer_ids
+        }
+        existing_answers = set()
+        if selected_ids:
+            existing_answers = set(map(str, (await session.execute(
+                select(Answer.id).where(Answer.id.in_(selected_ids)).with_for_update(read=True, key_share=True)
+            )).scalars()))
+        # Накопительная статистика обновляется в той же транзакции
+        await apply_stats_delta(session, collect_stats(saved, existing_answers))
+        await session.commit()
+        results = [result for _, result in saved]
+    return results, errors
+
+
+async def _submit_ticket(
+        submission: BulkExamSubmission,
+        user_id: UUID,
+        session: AsyncSession,
+) -> ExamResultOUT:
+    results, errors = await _grade_submissions([submission], session, user_id=user_id)
+    if errors:
+        _, status_code, detail = errors[0]
+        raise HTTPException(status_code=status_code, detail=detail)
+    return _result_out(results[0])
+
+
+async def _grade_bulk(
+        submissions: List[BulkExamSubmission],
+        session: AsyncSession,
+) -> BulkGradeResult:
+    if len(submissions) > settings.EXAM_BULK_GRADE_MAX:
+        raise HTTPException(status_code=413, detail=f"Не больше {settings.EXAM_BULK_GRADE_MAX} билетов за раз")
+    results, errors = await _grade_submissions(submissions, session)
+    return BulkGradeResult(
+        results=[_result_out(result) for result in results],
+        errors=[BulkGradeError(ticket_id=ticket_id, error=detail) for ticket_id, _, detail in errors],
+    )
+
+
+async def _get_result(
+        ticket_id: UUID,
+        session: AsyncSession,
+) -> Optional[ExamResult]:
+    return await session.get(ExamResult, ticket_id)
+
+
+##########################
+#       STATISTICS       #
+##########################
+
+
+async def _get_question_stats(
+        session: AsyncSession,
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+) -> List[QuestionStatsOUT]:
+    """
+    Анализ заданий по накопительным таблицам, без обращения к exam_results.
+    """
+    query = select(ExamQuestionStats, Question.title).join(
+        Question, Question.question_id == ExamQuestionStats.question_id,
+    )
+    if category_id is not None:
+        query = query.where(Question.category_id == category_id)
+    if type_select_id is not None:
+        query = query.where(Question.type_select_id == type_select_id)
+    rows = (await session.execute(query.order_by(Question.created_at))).all()
+    if not rows:
+        return []
+
+    answers = defaultdict(list)
+    answer_query = (
+        select(Answer.question_id, Answer.id, Answer.text, Answer.is_correct, ExamAnswerStats.selected)
+        .outerjoin(ExamAnswerStats, ExamAnswerStats.answer_id == Answer.id)
+        .where(Answer.question_id.in_([stats.question_id for stats, _ in rows]))
+        .order_by(Answer.created_at)
+    )
+    for question_id, answer_id, text, is_correct, selected in (await session.execute(answer_query)).all():
+        answers[str(question_id)].append((answer_id, text, is_correct, selected or 0))
+
+    report = []
+    for stats, title in rows:
+        report.append(QuestionStatsOUT(
+            question_id=stats.question_id,
+            title=title,
+            attempts=stats.attempts,
+            answers=[
+                AnswerStatsOUT(
+                    answer_id=answer_id,
+                    text=text,
+                    is_correct=is_correct,
+                    selected=selected,
+                    share=selected / stats.attempts if stats.attempts else None,
+                )
+                for answer_id, text, is_correct, selected in answers[str(stats.question_id)]
+            ],
+            **question_report(stats),
+        ))
+    return report
+
+
+async def _get_category_stats(session: AsyncSession) -> List[CategoryStatsOUT]:
+    result = await session.execute(
+        select(ExamCategoryStats).order_by(ExamCategoryStats.category_id, ExamCategoryStats.type_select_id)
+    )
+    return [
+        CategoryStatsOUT(
+            category_id=stats.category_id or None,
+            type_select_id=stats.type_select_id or None,
+            attempts=stats.attempts,
+            passed=stats.passed,
+            pass_rate=stats.passed / stats.attempts if stats.attempts else None,
+            mean_score_percent=100.0 * stats.sum_score / stats.attempts if stats.attempts else None,
+        )
+        for stats in result.scalars().all()
+    ]
@@ -0,0 +1,114 @@
+import asyncio
+
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.cache.versions import resource_versions, QUESTIONS
+from backend.src.ekzamens.models import Answer, ExamTicket
+
+
+class AnswerKey(NamedTuple):
+    answers: FrozenSet[str]
+    correct: FrozenSet[str]
+
+
+class GradeOutcome(NamedTuple):
+    positions: int
+    total: int
+    correct_count: int
+    correct_bitmap: bytes
+    selected: Dict[str, List[str]]
+
+
+def unpack_bitmap(bitmap: bytes, positions: int) -> List[bool]:
+    """
+    Маска результата по вопросам -> список "засчитан ли вопрос" по позициям.
+    """
+    return [bool(bitmap[i // 8] >> (i % 8) & 1) for i in range(positions)]
+
+
+class AnswerKeyCache:
+    """
+    Ключи ответов (question_id -> множества id ответов и верных ответов) в
+    памяти процесса. Ключи загружаются одним запросом для всех недостающих
+    вопросов и сбрасываются целиком при смене версии банка вопросов.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, AnswerKey] = {}
+        self._version: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def get_many(self, question_ids: Iterable, session: AsyncSession) -> Dict[str, AnswerKey]:
+        version = await resource_versions.get(QUESTIONS)
+        wanted = {str(question_id) for question_id in question_ids}
+        async with self._lock:
+            if version != self._version:
+                self._keys = {}
+                self._version = version
+            missing = wanted - self._keys.keys()
+            if missing:
+                query = select(Answer.question_id, Answer.id, Answer.is_correct).where(Answer.question_id.in_(missing))
+                answers = {question_id: set() for question_id in missing}
+                correct = {question_id: set() for question_id in missing}
+                for question_id, answer_id, is_correct in (await session.execute(query)).all():
+                    answers[str(question_id)].add(str(answer_id))
+                    if is_correct:
+                        correct[str(question_id)].add(str(answer_id))
+                for question_id in missing:
+                    self._keys[question_id] = AnswerKey(frozenset(answers[question_id]), frozenset(correct[question_id]))
+            return {question_id: self._keys[question_id] for question_id in wanted}
+
+
+def grade_ticket(
+        ticket: ExamTicket,
+        selected: Dict[str, Iterable],
+        keys: Dict[str, AnswerKey],
+) -> GradeOutcome:
+    """
+    Оценивает билет: вопрос засчитан, если множество выбранных ответов совпадает
+    с множеством верных. selected - question_id -> выбранные id ответов;
+    ответы, не относящиеся к вопросу, отбрасываются. Результат по вопросам
+    хранится битовой маской (бит position - 1).
+
+    Ключ вопроса берётся из снимка ответов, сделанного при выдаче билета
+    (answer_order, correct_answers), поэтому правка вопроса после выдачи не
+    меняет оценку. keys - текущие ключи для билетов, выданных без снимка.
+
+    Позиция, вопрос которой удалён до сдачи (question_id стал NULL), не
+    оценивается и не входит в total: экзаменуемый не может на неё ответить,
+    потому что ответы сопоставляются по question_id. Маска при этом остаётся
+    по всем позициям билета (positions), её бит для такой позиции - 0.
+    """
+    bitmap = bytearray((len(ticket.questions) + 7) // 8)
+    stored = {}
+    total = 0
+    correct_count = 0
+    for item in ticket.questions:
+        if item.question_id is None:
+            continue
+        total += 1
+        question_id = str(item.question_id)
+        if item.correct_answers is not None:
+            key = AnswerKey(frozenset(item.answer_order), frozenset(item.correct_answers))
+        else:
+            key = keys.get(question_id)
+        chosen = {str(answer_id) for answer_id in selected.get(question_id, ())}
+        if key is not None:
+            chosen &= key.answers
+        if chosen:
+            stored[str(item.position)] = sorted(chosen)
+        if key is not None and key.correct and chosen == key.correct:
+            correct_count += 1
+            bitmap[(item.position - 1) // 8] |= 1 << ((item.position - 1) % 8)
+    return GradeOutcome(len(ticket.questions), total, correct_count, bytes(bitmap), stored)
+
+
+def selected_by_question(answers) -> Dict[str, List[UUID]]:
+    return {str(answer.question_id): answer.answer_ids for answer in answers}
+
+
+answer_key_cache = AnswerKeyCache()
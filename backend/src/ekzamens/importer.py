@@ -0,0 +1,146 @@
+import csv
+import io
+import re
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from fastapi import HTTPException
+
+ANSWER_COLUMN = re.compile(r"^answer_?(\d+)$")
+# Excel на русской Windows сохраняет CSV в cp1251
+CSV_ENCODINGS = ("utf-8-sig", "cp1251")
+
+
+class ImportRow(NamedTuple):
+    row: int
+    data: Dict[str, Any]
+    errors: List[str]
+
+
+def rows_from_json(items: Sequence[Any]) -> List[ImportRow]:
+    rows = []
+    for number, item in enumerate(items, start=1):
+        if isinstance(item, dict):
+            rows.append(ImportRow(number, item, []))
+        else:
+            rows.append(ImportRow(number, {}, ["Ожидается объект вопроса"]))
+    return rows
+
+
+def _cell(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _table_row(number: int, record: Dict[str, Any]) -> ImportRow:
+    """
+    Строка таблицы: title, category | category_id, type_select | type_select_id,
+    answer_1 ... answer_N и correct - номера верных ответов через запятую.
+    """
+    errors = []
+    data: Dict[str, Any] = {
+        "title": _cell(record.get("title")),
+        "category": _cell(record.get("category")),
+        "type_select": _cell(record.get("type_select")),
+    }
+    for key in ("category_id", "type_select_id"):
+        value = _cell(record.get(key))
+        if value is not None:
+            try:
+                data[key] = int(float(value))
+            except ValueError:
+                errors.append(f"{key}: ожидается число, получено {value!r}")
+
+    numbered = []
+    for column, value in record.items():
+        match = ANSWER_COLUMN.match(column)
+        text = _cell(value)
+        if match and text is not None:
+            numbered.append((int(match.group(1)), text))
+    numbered.sort()
+
+    correct = set()
+    for token in (_cell(record.get("correct")) or "").replace(";", ",").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        try:
+            correct.add(int(float(token)))
+        except ValueError:
+            errors.append(f"correct: неверный номер ответа {token!r}")
+    missing = correct - {position for position, _ in numbered}
+    if missing:
+        errors.append(f"correct: нет ответов с номерами {sorted(missing)}")
+
+    data["answers"] = [{"text": text, "is_correct": position in correct} for position, text in numbered]
+    return ImportRow(number, data, errors)
+
+
+def _rows_from_records(header: Iterable[Any], records: Iterable[Sequence[Any]]) -> List[ImportRow]:
+    columns = [(_cell(column) or "").lower() for column in header]
+    rows = []
+    # Номера строк как в файле: первая строка - заголовок
+    for number, values in enumerate(records, start=2):
+        if all(_cell(value) is None for value in values):
+            continue
+        rows.append(_table_row(number, dict(zip(columns, values))))
+    return rows
+
+
+def _decode_csv(content: bytes) -> str:
+    for encoding in CSV_ENCODINGS:
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise HTTPException(
+        status_code=400,
+        detail=f"Не удалось прочитать CSV: поддерживаются кодировки {', '.join(CSV_ENCODINGS)}",
+    )
+
+
+def rows_from_csv(content: bytes) -> List[ImportRow]:
+    text = _decode_csv(content)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if header is None:
+        return []
+    return _rows_from_records(header, reader)
+
+
+def rows_from_xlsx(content: bytes) -> List[ImportRow]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Импорт XLSX недоступен: не установлен openpyxl")
+
+    try:
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось прочитать XLSX: {e}")
+    try:
+        records = workbook.active.iter_rows(values_only=True)
+        header = next(records, None)
+        if header is None:
+            return []
+        return _rows_from_records(header, records)
+    finally:
+        workbook.close()
+
+
+def rows_from_file(filename: str, content: bytes) -> List[ImportRow]:
+    """
+    Разбор CSV/XLSX целиком в памяти - вызывается из пула потоков, а не в event loop.
+    """
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return rows_from_csv(content)
+    if name.endswith(".xlsx"):
+        return rows_from_xlsx(content)
+    raise HTTPException(status_code=415, detail="Поддерживаются файлы .csv и .xlsx")
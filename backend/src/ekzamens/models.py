@@ -1,11 +1,17 @@
 import uuid
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, DateTime, ForeignKey, Text, LargeBinary, Float
+from sqlalchemy import BigInteger, Computed
+from sqlalchemy import Index
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from datetime import datetime
 
 BaseExam = declarative_base()
 
+# Поисковый вектор: русская морфология плюс конфигурация simple (без
+# стемминга) - для кыргызского текста, для которого в PostgreSQL нет словаря
+SEARCH_VECTOR_SQL = "to_tsvector('russian', coalesce({column}, '')) || to_tsvector('simple', coalesce({column}, ''))"
+
 
 class Category(BaseExam):
 
@@ -51,6 +57,15 @@ class Question(BaseExam):
 
     answers = relationship("Answer", back_populates="question")
 
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL.format(column="title"), persisted=True)))
+
+    __table_args__ = (
+        Index('ix_questions_created_at_question_id', 'created_at', 'question_id'),
+        Index('ix_questions_category_type_created_at', 'category_id', 'type_select_id', 'created_at', 'question_id'),
+        Index('ix_questions_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_questions_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
+
     def __str__(self):
         return self.title
 
@@ -64,8 +79,122 @@ class Answer(BaseExam):
     is_correct = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    question_id = Column(UUID, ForeignKey('questions.question_id'), nullable=True)
+    question_id = Column(UUID, ForeignKey('questions.question_id'), nullable=True, index=True)
     question = relationship("Question", back_populates="answers")
 
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL.format(column="text"), persisted=True)))
+
+    __table_args__ = (
+        Index('ix_answers_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
     def __str__(self):
         return self.text
+
+
+class ExamTicket(BaseExam):
+
+    __tablename__ = 'exam_tickets'
+
+    ticket_id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID, index=True, nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id'), nullable=True)
+    type_select_id = Column(Integer, ForeignKey('type_selections.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    questions = relationship(
+        "ExamTicketQuestion",
+        back_populates="ticket",
+        order_by="ExamTicketQuestion.position",
+        cascade="all, delete-orphan",
+    )
+
+
+class ExamTicketQuestion(BaseExam):
+
+    __tablename__ = 'exam_ticket_questions'
+
+    ticket_id = Column(UUID, ForeignKey('exam_tickets.ticket_id', ondelete='CASCADE'), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    question_id = Column(UUID, ForeignKey('questions.question_id', ondelete='SET NULL'), nullable=True, index=True)
+    # Порядок ответов, в котором они были показаны (список Answer.id)
+    answer_order = Column(JSONB, nullable=False)
+    # Верные ответы на момент выдачи билета: правка вопроса не меняет оценку
+    # уже выданных билетов. NULL - билеты, выданные до появления колонки
+    correct_answers = Column(JSONB, nullable=True)
+
+    ticket = relationship("ExamTicket", back_populates="questions")
+
+
+class ExamResult(BaseExam):
+    """
+    Результат сдачи билета. По вопросам хранится только битовая маска
+    верных ответов (бит position - 1) и выбранные ответы, поэтому сводные
+    отчёты считаются по этой таблице без обращения к билетам.
+    """
+
+    __tablename__ = 'exam_results'
+
+    ticket_id = Column(UUID, ForeignKey('exam_tickets.ticket_id', ondelete='CASCADE'), primary_key=True)
+    user_id = Column(UUID, nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id'), nullable=True)
+    type_select_id = Column(Integer, ForeignKey('type_selections.id'), nullable=True)
+    # Вопросы, вошедшие в оценку; позиции удалённых до сдачи вопросов не считаются
+    total = Column(SmallInteger, nullable=False)
+    # Число позиций билета - длина битовой маски
+    positions = Column(SmallInteger, nullable=False)
+    correct_count = Column(SmallInteger, nullable=False)
+    score_percent = Column(Float, nullable=False)
+    passed = Column(Boolean, nullable=False)
+    correct_bitmap = Column(LargeBinary, nullable=False)
+    # position -> выбранные id ответов
+    selected = Column(JSONB, nullable=False)
+    submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_exam_results_user_id_submitted_at', 'user_id', 'submitted_at'),
+        Index('ix_exam_results_category_submitted_at', 'category_id', 'type_select_id', 'submitted_at'),
+    )
+
+
+class ExamQuestionStats(BaseExam):
+    """
+    Накопительные суммы по вопросу для анализа заданий. score - доля верных
+    ответов экзаменуемого по всему билету (0..1); по этим суммам считаются
+    трудность и точечно-бисериальный индекс дискриминации.
+    """
+
+    __tablename__ = 'exam_question_stats'
+
+    question_id = Column(UUID, ForeignKey('questions.question_id', ondelete='CASCADE'), primary_key=True)
+    attempts = Column(BigInteger, nullable=False, default=0)
+    correct = Column(BigInteger, nullable=False, default=0)
+    sum_score = Column(Float, nullable=False, default=0)
+    sum_score_sq = Column(Float, nullable=False, default=0)
+    sum_score_correct = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ExamAnswerStats(BaseExam):
+
+    __tablename__ = 'exam_answer_stats'
+
+    answer_id = Column(UUID, ForeignKey('answers.id', ondelete='CASCADE'), primary_key=True)
+    question_id = Column(UUID, ForeignKey('questions.question_id', ondelete='CASCADE'), nullable=False, index=True)
+    selected = Column(BigInteger, nullable=False, default=0)
+
+
+class ExamCategoryStats(BaseExam):
+    """
+    Сдачи по категории и типу выборки. 0 вместо NULL означает "не задано",
+    чтобы пара могла быть первичным ключом.
+    """
+
+    __tablename__ = 'exam_category_stats'
+
+    category_id = Column(Integer, primary_key=True)
+    type_select_id = Column(Integer, primary_key=True)
+    attempts = Column(BigInteger, nullable=False, default=0)
+    passed = Column(BigInteger, nullable=False, default=0)
+    sum_score = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import random
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.cache.versions import resource_versions, QUESTIONS
+from backend.src.ekzamens.models import Question
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[Optional[int], Optional[int]]
+
+
+class QuestionPool:
+    """
+    Идентификаторы вопросов в памяти процесса, сгруппированные по
+    (category_id, type_select_id); ключ (category_id, None) - все типы категории.
+
+    Билет собирается выборкой из готового списка id вместо ORDER BY random()
+    по таблице вопросов. Пул перечитывается одним запросом, когда меняется
+    версия ресурса вопросов (её обновляют CRUD-функции вопросов).
+    """
+
+    def __init__(self):
+        self._pools: Dict[PoolKey, Tuple[UUID, ...]] = {}
+        self._version: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._random = random.SystemRandom()
+
+    async def _ensure_fresh(self, session: AsyncSession) -> None:
+        version = await resource_versions.get(QUESTIONS)
+        if version == self._version:
+            return
+        async with self._lock:
+            if version == self._version:
+                return
+            result = await session.execute(
+                select(Question.question_id, Question.category_id, Question.type_select_id)
+            )
+            pools = defaultdict(list)
+            for question_id, category_id, type_select_id in result.all():
+                pools[(category_id, None)].append(question_id)
+                if type_select_id is not None:
+                    pools[(category_id, type_select_id)].append(question_id)
+            self._pools = {key: tuple(ids) for key, ids in pools.items()}
+            self._version = version
+            logger.info("Question pool loaded: %d groups", len(self._pools))
+
+    async def sample(
+            self,
+            session: AsyncSession,
+            category_id: Optional[int],
+            type_select_id: Optional[int],
+            count: int,
+    ) -> List[UUID]:
+        """
+        Случайные count вопросов группы без повторов. ValueError, если в группе
+        меньше вопросов.
+        """
+        await self._ensure_fresh(session)
+        ids = self._pools.get((category_id, type_select_id), ())
+        if len(ids) < count:
+            raise ValueError(f"В выбранной категории {len(ids)} вопросов, требуется {count}")
+        return self._random.sample(ids, count)
+
+    def shuffle(self, items: list) -> list:
+        self._random.shuffle(items)
+        return items
+
+
+question_pool = QuestionPool()
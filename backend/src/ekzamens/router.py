@@ -1,22 +1,44 @@
 import uuid
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Body, File, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Any, List, Literal, Optional
+from backend.cache.etag import ConditionalGet
+from backend.cache.versions import CATEGORIES, TYPE_SELECTIONS, QUESTIONS
+from backend.config import settings
+from backend.db.pagination import set_page_headers
 from backend.db.session import get_db
+from backend.src.account.auth.jwt import get_current_user_from_token
+from backend.src.account.user.dals import User
+from backend.src.ekzamens.importer import rows_from_json, rows_from_file
 from backend.src.ekzamens.schemas import AnswerOUTPUT, AnswerCreate, QuestionOUTPUT, QuestionCreate, QuestionUpdate, \
     QuestionDelete
 from backend.src.ekzamens.schemas import CategoryCreate, CategoryOUTPUT, CategoryUpdate, CategoryDelete
 from backend.src.ekzamens.schemas import TypeSelectionCreate, TypeSelectionOUTPUT, TypeSelectionSchema, TypeSelectionUpdate, TypeSelectionDelete
-
-from backend.src.ekzamens.crud import _create_answer, _get_answer, _get_question, _create_question, _get_question_by_id, \
-    _update_question, _delete_question
+from backend.src.ekzamens.schemas import QuestionImportResult, QuestionListOUT
+from backend.src.ekzamens.schemas import QuestionCreateOUT, QuestionSearchOUT, SimilarQuestionOUT
+from backend.src.ekzamens.schemas import ExamTicketCreate, ExamTicketOUT
+from backend.src.ekzamens.schemas import ExamSubmission, BulkExamSubmission, ExamResultOUT, BulkGradeResult
+from backend.src.ekzamens.schemas import QuestionStatsOUT, CategoryStatsOUT
+
+from backend.src.ekzamens.crud import _create_answer, _get_answer, _get_questions_page, _create_question, _get_question_by_id, \
+    _update_question, _delete_question, _import_questions
+from backend.src.ekzamens.crud import _create_ticket, _get_ticket, _get_ticket_out
+from backend.src.ekzamens.crud import _submit_ticket, _grade_bulk, _get_result, _result_out
+from backend.src.ekzamens.crud import _get_question_stats, _get_category_stats
+from backend.src.ekzamens.crud import _search_questions, _find_similar_questions
+from backend.src.ekzamens.stats import recompute_stats
 from backend.src.ekzamens.crud import _create_category, _get_category_by_id, _get_all_categories, _update_category, _delete_category
 from backend.src.ekzamens.crud import _create_type_selection, _get_type_selection, _get_type_selections_by_id, _update_type_selection, _delete_type_selection
 
 router = APIRouter()
 
+categories_etag = ConditionalGet(CATEGORIES, cache_control=settings.REFERENCE_CACHE_CONTROL)
+type_selections_etag = ConditionalGet(TYPE_SELECTIONS, cache_control=settings.REFERENCE_CACHE_CONTROL)
+questions_etag = ConditionalGet(QUESTIONS, cache_control=settings.QUESTIONS_CACHE_CONTROL)
+
 ##########################
 #        CATEGORY        #
 ##########################
@@ -34,8 +56,9 @@ async def create_category(
 @router.get('/category_get', response_model=List[CategoryOUTPUT])
 async def get_all_categories(
         session: AsyncSession = Depends(get_db),
+        versions: dict = Depends(categories_etag),
 ):
-    get_all_categories = await _get_all_categories(session)
+    get_all_categories = await _get_all_categories(session, versions[CATEGORIES])
     if not get_all_categories:
         raise HTTPException(status_code=404, detail="No categories found")
     return get_all_categories
@@ -86,8 +109,9 @@ async def create_type_selection(
 @router.get('/type_selection_get', response_model=List[TypeSelectionSchema])
 async def get_all_type_selections(
         session: AsyncSession = Depends(get_db),
+        versions: dict = Depends(type_selections_etag),
 ):
-    get_all_type_selections = await _get_type_selection(session)
+    get_all_type_selections = await _get_type_selection(session, versions[TYPE_SELECTIONS])
     if not get_all_type_selections:
         raise HTTPException(status_code=404, detail="No type selections found")
     return get_all_type_selections
@@ -116,7 +140,7 @@ async def delete_type_selection(
 #        QUESTION        #
 ##########################
 
-@router.post('/create/question')
+@router.post('/create/question', response_model=QuestionCreateOUT)
 async def create_question(
         body: QuestionCreate,
         session: AsyncSession = Depends(get_db),
@@ -125,14 +149,68 @@ async def create_question(
     return created_question
 
 
-@router.get('/question_get', response_model=List[QuestionOUTPUT])
+@router.post('/import/questions', response_model=QuestionImportResult)
+async def import_questions(
+        body: List[Any] = Body(...),
+        partial: bool = Query(False, description="Записать корректные строки, даже если в других есть ошибки"),
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    return await _import_questions(rows_from_json(body), session, partial=partial)
+
+
+@router.post('/import/questions/file', response_model=QuestionImportResult)
+async def import_questions_file(
+        file: UploadFile = File(..., description="CSV или XLSX: title, category, type_select, answer_1..answer_N, correct"),
+        partial: bool = Query(False, description="Записать корректные строки, даже если в других есть ошибки"),
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    content = await file.read()
+    rows = await run_in_threadpool(rows_from_file, file.filename, content)
+    return await _import_questions(rows, session, partial=partial)
+
+
+@router.get('/questions/search', response_model=List[QuestionSearchOUT])
+async def search_questions(
+        q: str = Query(..., min_length=2),
+        limit: int = Query(settings.QUESTION_SEARCH_LIMIT, ge=1, le=settings.PAGE_SIZE_MAX),
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+        session: AsyncSession = Depends(get_db),
+):
+    return await _search_questions(q, session, limit=limit, category_id=category_id, type_select_id=type_select_id)
+
+
+@router.get('/questions/similar', response_model=List[SimilarQuestionOUT])
+async def similar_questions(
+        title: str = Query(..., min_length=3),
+        threshold: Optional[float] = Query(None, ge=0, le=1),
+        limit: int = Query(5, ge=1, le=50),
+        session: AsyncSession = Depends(get_db),
+):
+    return await _find_similar_questions(title, session, threshold=threshold, limit=limit)
+
+
+@router.get('/question_get', response_model=List[QuestionListOUT], response_model_exclude_unset=True)
 async def get_all_questions(
+        response: Response,
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+        include: Optional[Literal["answers"]] = None,
         session: AsyncSession = Depends(get_db),
+        versions: dict = Depends(questions_etag),
 ):
-    get_all_questions = await _get_question(session)
-    if not get_all_questions:
+    questions, next_cursor = await _get_questions_page(
+        session, limit=limit, cursor=cursor, category_id=category_id,
+        type_select_id=type_select_id, include_answers=include == "answers",
+    )
+    if not questions and cursor is None:
         raise HTTPException(status_code=404, detail="No questions found")
-    return get_all_questions
+    set_page_headers(response, next_cursor)
+    return questions
 
 
 @router.get('/questions_id/{question_id}', response_model=QuestionOUTPUT)
@@ -168,3 +246,109 @@ async def delete_question(
         raise HTTPException(status_code=404, detail="Question not found")
     return deleted_question
 
+
+##########################
+#      EXAM TICKETS      #
+##########################
+
+
+@router.post('/tickets', response_model=ExamTicketOUT)
+async def create_ticket(
+        body: ExamTicketCreate,
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    return await _create_ticket(body, current_user.user_id, session)
+
+
+@router.get('/tickets/{ticket_id}', response_model=ExamTicketOUT)
+async def get_ticket(
+        ticket_id: UUID,
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    ticket = await _get_ticket(ticket_id, session)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Билет не найден")
+    if str(ticket.user_id) != str(current_user.user_id) and not (current_user.is_admin or current_user.is_superadmin):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return await _get_ticket_out(ticket, session)
+
+
+##########################
+#        GRADING         #
+##########################
+
+
+@router.post('/tickets/{ticket_id}/submit', response_model=ExamResultOUT)
+async def submit_ticket(
+        ticket_id: UUID,
+        body: ExamSubmission,
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    submission = BulkExamSubmission(ticket_id=ticket_id, answers=body.answers)
+    return await _submit_ticket(submission, current_user.user_id, session)
+
+
+@router.post('/results/bulk', response_model=BulkGradeResult)
+async def grade_bulk(
+        body: List[BulkExamSubmission],
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    _require_admin(current_user)
+    return await _grade_bulk(body, session)
+
+
+@router.get('/results/{ticket_id}', response_model=ExamResultOUT)
+async def get_result(
+        ticket_id: UUID,
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    result = await _get_result(ticket_id, session)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Результат не найден")
+    if str(result.user_id) != str(current_user.user_id) and not (current_user.is_admin or current_user.is_superadmin):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return _result_out(result)
+
+
+##########################
+#       STATISTICS       #
+##########################
+
+
+def _require_admin(current_user: User) -> None:
+    if not (current_user.is_admin or current_user.is_superadmin):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get('/stats/questions', response_model=List[QuestionStatsOUT])
+async def get_question_stats(
+        category_id: Optional[int] = None,
+        type_select_id: Optional[int] = None,
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    _require_admin(current_user)
+    return await _get_question_stats(session, category_id, type_select_id)
+
+
+@router.get('/stats/categories', response_model=List[CategoryStatsOUT])
+async def get_category_stats(
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    _require_admin(current_user)
+    return await _get_category_stats(session)
+
+
+@router.post('/stats/recompute')
+async def recompute_exam_stats(
+        session: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user_from_token),
+):
+    _require_admin(current_user)
+    return await recompute_stats(session)
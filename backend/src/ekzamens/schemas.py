@@ -135,6 +135,16 @@ class QuestionDelete(BaseModel):
     title: str
 
 
+class QuestionListOUT(BaseModel):
+    question_id: UUID
+    title: str
+    category_id: Optional[int]
+    type_select_id: Optional[int]
+    created_at: Optional[datetime]
+    # Только при include=answers
+    answers: Optional[List[AnswerOUTPUT]] = None
+
+
 class QuestionOUTPUT(BaseModel):
     question_id: UUID
     title: str
@@ -144,3 +154,136 @@ class QuestionOUTPUT(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class QuestionImportRow(BaseModel):
+    """
+    Вопрос для массового импорта. Категорию и тип выборки можно указать
+    id или названием.
+    """
+    title: str
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    type_select_id: Optional[int] = None
+    type_select: Optional[str] = None
+    answers: List[AnswerCreate]
+
+
+class QuestionImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class QuestionImportResult(BaseModel):
+    created: int
+    question_ids: List[UUID]
+    errors: List[QuestionImportError]
+
+
+class ExamTicketCreate(BaseModel):
+    category_id: int
+    type_select_id: Optional[int] = None
+    question_count: Optional[int] = None
+
+
+class TicketAnswerOUT(BaseModel):
+    id: UUID
+    text: str
+
+
+class TicketQuestionOUT(BaseModel):
+    position: int
+    question_id: Optional[UUID]
+    title: Optional[str]
+    answers: List[TicketAnswerOUT]
+
+
+class ExamTicketOUT(BaseModel):
+    ticket_id: UUID
+    user_id: UUID
+    category_id: Optional[int]
+    type_select_id: Optional[int]
+    created_at: datetime
+    questions: List[TicketQuestionOUT]
+
+
+class SubmittedAnswer(BaseModel):
+    question_id: UUID
+    answer_ids: List[UUID]
+
+
+class ExamSubmission(BaseModel):
+    answers: List[SubmittedAnswer]
+
+
+class BulkExamSubmission(ExamSubmission):
+    ticket_id: UUID
+
+
+class ExamResultOUT(BaseModel):
+    ticket_id: UUID
+    user_id: UUID
+    # Вопросы, вошедшие в оценку (без удалённых до сдачи)
+    total: int
+    correct_count: int
+    score_percent: float
+    passed: bool
+    submitted_at: datetime
+    # Засчитан ли вопрос билета, по порядку позиций
+    correct: List[bool]
+
+
+class BulkGradeError(BaseModel):
+    ticket_id: UUID
+    error: str
+
+
+class BulkGradeResult(BaseModel):
+    results: List[ExamResultOUT]
+    errors: List[BulkGradeError]
+
+
+class AnswerStatsOUT(BaseModel):
+    answer_id: UUID
+    text: str
+    is_correct: bool
+    selected: int
+    # Доля попыток, в которых выбран этот ответ
+    share: Optional[float]
+
+
+class QuestionStatsOUT(BaseModel):
+    question_id: UUID
+    title: str
+    attempts: int
+    difficulty: Optional[float]
+    discrimination: Optional[float]
+    answers: List[AnswerStatsOUT]
+
+
+class CategoryStatsOUT(BaseModel):
+    category_id: Optional[int]
+    type_select_id: Optional[int]
+    attempts: int
+    passed: int
+    pass_rate: Optional[float]
+    mean_score_percent: Optional[float]
+
+
+class SimilarQuestionOUT(BaseModel):
+    question_id: UUID
+    title: str
+    similarity: float
+
+
+class QuestionCreateOUT(QuestionOUTPUT):
+    # Уже существующие вопросы с похожим текстом (возможные дубликаты)
+    similar: List[SimilarQuestionOUT] = []
+
+
+class QuestionSearchOUT(BaseModel):
+    question_id: UUID
+    title: str
+    category_id: Optional[int]
+    type_select_id: Optional[int]
+    rank: float
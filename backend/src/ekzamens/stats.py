@@ -0,0 +1,214 @@
+import logging
+import math
+
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.src.ekzamens.grading import unpack_bitmap
+from backend.src.ekzamens.models import Answer, ExamResult, ExamTicket, ExamTicketQuestion
+from backend.src.ekzamens.models import ExamQuestionStats, ExamAnswerStats, ExamCategoryStats
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+QUESTION_SUMS = ("attempts", "correct", "sum_score", "sum_score_sq", "sum_score_correct")
+CATEGORY_SUMS = ("attempts", "passed", "sum_score")
+
+
+class StatsDelta(NamedTuple):
+    questions: Dict[str, List[float]]
+    answers: Dict[Tuple[str, str], int]
+    categories: Dict[Tuple[int, int], List[float]]
+
+
+def _category_key(category_id: Optional[int], type_select_id: Optional[int]) -> Tuple[int, int]:
+    return category_id or 0, type_select_id or 0
+
+
+def collect_stats(
+        graded: Iterable[Tuple[ExamTicket, ExamResult]],
+        existing_answers: Optional[set] = None,
+) -> StatsDelta:
+    """
+    Приращения накопительных сумм по пачке оценённых билетов. Если передан
+    existing_answers, выбор ответов вне этого множества (удалённых) не считается.
+    """
+    questions = defaultdict(lambda: [0, 0, 0.0, 0.0, 0.0])
+    answers = Counter()
+    categories = defaultdict(lambda: [0, 0, 0.0])
+    for ticket, result in graded:
+        score = result.score_percent / 100.0
+        correct = unpack_bitmap(result.correct_bitmap, result.positions)
+        for item in ticket.questions:
+            if item.question_id is None:
+                continue
+            question_id = str(item.question_id)
+            is_correct = correct[item.position - 1]
+            sums = questions[question_id]
+            sums[0] += 1
+            sums[1] += is_correct
+            sums[2] += score
+            sums[3] += score * score
+            sums[4] += score if is_correct else 0.0
+            for answer_id in result.selected.get(str(item.position), ()):
+                if existing_answers is not None and answer_id not in existing_answers:
+                    continue
+                answers[(question_id, answer_id)] += 1
+        sums = categories[_category_key(result.category_id, result.type_select_id)]
+        sums[0] += 1
+        sums[1] += result.passed
+        sums[2] += score
+    return StatsDelta(dict(questions), dict(answers), dict(categories))
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def apply_stats_delta(session: AsyncSession, delta: StatsDelta) -> None:
+    """
+    Прибавляет приращения к накопительным таблицам многострочными
+    INSERT ... ON CONFLICT DO UPDATE. Коммит - на вызывающей стороне, вместе
+    с записью результатов.
+    """
+    now = datetime.utcnow()
+    question_rows = [
+        dict(question_id=question_id, updated_at=now, **dict(zip(QUESTION_SUMS, sums)))
+        for question_id, sums in delta.questions.items()
+    ]
+    answer_rows = [
+        dict(answer_id=answer_id, question_id=question_id, selected=count)
+        for (question_id, answer_id), count in delta.answers.items()
+    ]
+    category_rows = [
+        dict(category_id=category_id, type_select_id=type_select_id, updated_at=now, **dict(zip(CATEGORY_SUMS, sums)))
+        for (category_id, type_select_id), sums in delta.categories.items()
+    ]
+
+    for model, rows, key, sums in (
+        (ExamQuestionStats, question_rows, ["question_id"], QUESTION_SUMS),
+        (ExamAnswerStats, answer_rows, ["answer_id"], ("selected",)),
+        (ExamCategoryStats, category_rows, ["category_id", "type_select_id"], CATEGORY_SUMS),
+    ):
+        table = model.__table__
+        for chunk in _chunks(rows):
+            statement = insert(table).values(chunk)
+            update = {column: table.c[column] + statement.excluded[column] for column in sums}
+            if "updated_at" in table.c:
+                update["updated_at"] = statement.excluded.updated_at
+            await session.execute(statement.on_conflict_do_update(index_elements=key, set_=update))
+
+
+async def recompute_stats(session: AsyncSession) -> Dict[str, int]:
+    """
+    Полный пересчёт накопительных таблиц по exam_results средствами NumPy.
+
+    Таблицы статистики блокируются до чтения результатов: оценка билетов,
+    начавшаяся во время пересчёта, дождётся его окончания и добавит свои
+    приращения поверх, поэтому ничего не теряется и не считается дважды.
+    """
+    await session.execute(text(
+        "LOCK TABLE exam_question_stats, exam_answer_stats, exam_category_stats IN SHARE ROW EXCLUSIVE MODE"
+    ))
+
+    results = (await session.execute(select(
+        ExamResult.ticket_id, ExamResult.category_id, ExamResult.type_select_id, ExamResult.score_percent,
+        ExamResult.passed, ExamResult.total, ExamResult.correct_bitmap, ExamResult.selected,
+    ))).all()
+    by_ticket = {}
+    for index, row in enumerate(results):
+        by_ticket[str(row.ticket_id)] = (index, row)
+
+    # Ответы, удалённые после сдачи, в статистику не попадают
+    existing_answers = set(map(str, (await session.execute(select(Answer.id))).scalars()))
+
+    # Одна строка на (результат, вопрос билета)
+    result_index, question_index, correct = [], [], []
+    question_ids: Dict[str, int] = {}
+    answers = Counter()
+    bitmaps = {}
+    query = select(ExamTicketQuestion.ticket_id, ExamTicketQuestion.position, ExamTicketQuestion.question_id).where(
+        ExamTicketQuestion.question_id.isnot(None),
+        ExamTicketQuestion.ticket_id.in_(select(ExamResult.ticket_id)),
+    )
+    for ticket_id, position, question_id in (await session.execute(query)).all():
+        index, row = by_ticket[str(ticket_id)]
+        bits = bitmaps.get(index)
+        if bits is None:
+            bits = bitmaps[index] = np.unpackbits(
+                np.frombuffer(row.correct_bitmap, dtype=np.uint8), bitorder="little",
+            )
+        question_id = str(question_id)
+        result_index.append(index)
+        question_index.append(question_ids.setdefault(question_id, len(question_ids)))
+        correct.append(bits[position - 1])
+        for answer_id in row.selected.get(str(position), ()):
+            if answer_id in existing_answers:
+                answers[(question_id, answer_id)] += 1
+
+    scores = np.array([row.score_percent for row in results], dtype=np.float64) / 100.0
+    question_count = len(question_ids)
+    result_index = np.asarray(result_index, dtype=np.int64)
+    question_index = np.asarray(question_index, dtype=np.int64)
+    correct = np.asarray(correct, dtype=np.float64)
+    item_scores = scores[result_index] if len(result_index) else np.zeros(0)
+
+    attempts = np.bincount(question_index, minlength=question_count)
+    correct_sums = np.bincount(question_index, weights=correct, minlength=question_count)
+    score_sums = np.bincount(question_index, weights=item_scores, minlength=question_count)
+    score_sq_sums = np.bincount(question_index, weights=item_scores ** 2, minlength=question_count)
+    score_correct_sums = np.bincount(question_index, weights=item_scores * correct, minlength=question_count)
+
+    categories = defaultdict(lambda: [0, 0, 0.0])
+    for row, score in zip(results, scores):
+        sums = categories[_category_key(row.category_id, row.type_select_id)]
+        sums[0] += 1
+        sums[1] += row.passed
+        sums[2] += float(score)
+
+    delta = StatsDelta(
+        questions={
+            question_id: [
+                int(attempts[i]), int(correct_sums[i]), float(score_sums[i]),
+                float(score_sq_sums[i]), float(score_correct_sums[i]),
+            ]
+            for question_id, i in question_ids.items()
+        },
+        answers=dict(answers),
+        categories=dict(categories),
+    )
+    for model in (ExamQuestionStats, ExamAnswerStats, ExamCategoryStats):
+        await session.execute(delete(model))
+    await apply_stats_delta(session, delta)
+    await session.commit()
+
+    logger.info("Exam stats recomputed: %d results, %d questions", len(results), question_count)
+    return {"results": len(results), "questions": question_count, "answers": len(answers)}
+
+
+def question_report(stats: ExamQuestionStats) -> Dict[str, Optional[float]]:
+    """
+    Трудность (доля верных ответов) и точечно-бисериальная корреляция
+    верного ответа на вопрос с общим результатом по билету.
+    """
+    n = stats.attempts
+    if not n:
+        return {"difficulty": None, "discrimination": None}
+    p = stats.correct / n
+    mean = stats.sum_score / n
+    variance = stats.sum_score_sq / n - mean * mean
+    discrimination = None
+    if 0 < stats.correct < n and variance > 1e-12:
+        mean_correct = stats.sum_score_correct / stats.correct
+        mean_wrong = (stats.sum_score - stats.sum_score_correct) / (n - stats.correct)
+        discrimination = (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+    return {"difficulty": p, "discrimination": discrimination}
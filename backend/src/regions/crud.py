@@ -1,9 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import Union
+from typing import Optional, Union
 from fastapi import HTTPException
 
-from backend.src.regions.schemas import RegionCreate
+from backend.cache.reference import reference_cache, REGIONS
+from backend.config import settings
+from backend.src.regions.schemas import RegionCreate, RegionOUT
 from backend.src.regions.schemas import RegionSchemas
 from backend.src.regions.schemas import RegionUpdate
 from backend.src.regions.models import Region
@@ -17,19 +19,24 @@ async def _create_region(
     session.add(db_region)
     await session.commit()
     await session.refresh(db_region)
+    await reference_cache.invalidate(REGIONS)
     return db_region
 
 
-async def _get_all_regions(session: AsyncSession):
-    result = await session.execute(select(Region))
-    regions = result.scalars().all()
-    return regions
+async def _load_regions(session: AsyncSession):
+    result = await session.execute(select(Region).order_by(Region.id))
+    return [RegionOUT.from_orm(region) for region in result.scalars().all()]
 
 
-async def _get_is_active(session: AsyncSession):
-    query = select(Region).where(Region.is_active == True)
-    res = await session.execute(query)
-    return res.scalars().all()
+async def _get_all_regions(session: AsyncSession, version: Optional[str] = None):
+    return await reference_cache.get_or_load(
+        REGIONS, lambda: _load_regions(session), ttl=settings.REGIONS_CACHE_TTL, version=version,
+    )
+
+
+async def _get_is_active(session: AsyncSession, version: Optional[str] = None):
+    regions = await _get_all_regions(session, version)
+    return [region for region in regions if region["is_active"]]
 
 
 async def _get_region_by_id(
@@ -57,6 +64,7 @@ async def _update_region(
     session.add(db_region)
     await session.commit()
     await session.refresh(db_region)
+    await reference_cache.invalidate(REGIONS)
     return db_region
 
 
@@ -69,6 +77,7 @@ async def _delete_region(
         raise HTTPException(status_code=404, detail="Регион не найден")
     await session.delete(db_region)
     await session.commit()
+    await reference_cache.invalidate(REGIONS)
     return db_region
 
 
@@ -85,4 +94,5 @@ async def _disable_region(
 
     db_region.is_active = False
     await session.commit()
+    await reference_cache.invalidate(REGIONS)
     return db_region
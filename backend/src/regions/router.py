@@ -4,6 +4,9 @@ from typing import List
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.cache.etag import ConditionalGet
+from backend.cache.versions import REGIONS
+from backend.config import settings
 from backend.src.account.user.dals import User
 from backend.src.account.auth.jwt import get_current_user_from_token
 from backend.src.regions.crud import _create_region, _get_all_regions, _get_is_active, _get_region_by_id
@@ -15,6 +18,8 @@ from backend.src.regions.models import Region
 
 router = APIRouter()
 
+regions_etag = ConditionalGet(REGIONS, cache_control=settings.REFERENCE_CACHE_CONTROL)
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(filename='log/regions.log', level=logging.INFO)
 
@@ -38,10 +43,11 @@ async def create_region(
 async def read_regions(
         session: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token),
+        versions: dict = Depends(regions_etag),
 ):
     logger.info("Получен запрос на вывод всех пользователей")
 
-    all_regions = await _get_all_regions(session)
+    all_regions = await _get_all_regions(session, versions[REGIONS])
     if not all_regions:
         raise HTTPException(status_code=404, detail="Регионов не найдено")
     return all_regions
@@ -51,10 +57,11 @@ async def read_regions(
 async def read_active_regions(
         session: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user_from_token),
+        versions: dict = Depends(regions_etag),
 ):
     logger.info("Получен запрос на вывод активных регионов")
 
-    is_active_region = await _get_is_active(session)
+    is_active_region = await _get_is_active(session, versions[REGIONS])
     return is_active_region
 
 
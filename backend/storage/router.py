@@ -0,0 +1,46 @@
+import os
+import re
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from backend.config import settings
+from backend.storage.thumbnails import FORMATS, find_source, thumbnail_generator, thumbnail_path
+
+router = APIRouter()
+
+SHA256 = re.compile(r"^[0-9a-f]{64}$")
+VARIANT = re.compile(r"^(\d+)\.([a-z]+)$")
+
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+@router.get("/thumbs/{sha256}/{variant}")
+async def get_thumbnail(sha256: str, variant: str):
+    """
+    Миниатюра аватара. Адрес зависит от содержимого исходного файла, поэтому
+    ответ кэшируется как неизменяемый. Отсутствующие варианты (новый размер
+    в настройках, очищенный каталог) создаются при первом запросе.
+    """
+    match = VARIANT.match(variant)
+    if not SHA256.match(sha256) or match is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    size, extension = int(match.group(1)), match.group(2)
+    if size not in settings.AVATAR_THUMBNAIL_SIZES or extension not in FORMATS:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    path = thumbnail_path(sha256, size, extension)
+    if not os.path.exists(path):
+        source = find_source(sha256)
+        if source is None:
+            raise HTTPException(status_code=404, detail="Thumbnail not found")
+        try:
+            await thumbnail_generator.generate(source, sha256, trigger="lazy")
+        except Exception:
+            raise HTTPException(status_code=422, detail="Не удалось обработать изображение")
+
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[extension],
+        headers={"Cache-Control": settings.IMMUTABLE_CACHE_CONTROL},
+    )
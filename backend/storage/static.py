@@ -0,0 +1,252 @@
+import hashlib
+import os
+import re
+import stat
+
+from mimetypes import guess_type
+from typing import Dict, Optional, Tuple
+
+import anyio
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+
+from backend.config import settings
+
+# Предсжатые копии рядом с файлом: style.css.br, style.css.gz
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# name.<8 hex>.ext - адрес с отпечатком содержимого
+FINGERPRINTED = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{8})(?P<ext>\.[^./]+)$")
+FINGERPRINT_LENGTH = 8
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# Отпечаток файла, пока не изменились mtime и размер: путь -> (mtime, size, hash)
+_fingerprints: Dict[str, Tuple[float, int, str]] = {}
+
+
+def fingerprint(full_path: str, stat_result: Optional[os.stat_result] = None) -> str:
+    stat_result = stat_result or os.stat(full_path)
+    cached = _fingerprints.get(full_path)
+    if cached is not None and cached[:2] == (stat_result.st_mtime, stat_result.st_size):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()[:FINGERPRINT_LENGTH]
+    _fingerprints[full_path] = (stat_result.st_mtime, stat_result.st_size, value)
+    return value
+
+
+class RangeFileResponse(FileResponse):
+    """
+    206 Partial Content: байты [start, end] файла.
+    """
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # Файл укоротился во время отдачи - закрываем тело, чтобы клиент не ждал
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _prefix_inside(directory, root) -> Optional[str]:
+    """
+    Путь каталога относительно root в виде префикса "a/b/" или None, если
+    каталог лежит вне root.
+    """
+    try:
+        relative = os.path.relpath(os.path.abspath(directory), os.path.abspath(root))
+    except ValueError:
+        # Другой диск (Windows)
+        return None
+    if relative == os.curdir:
+        return ""
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    return relative.replace(os.sep, "/") + "/"
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Один диапазон bytes=a-b | a- | -n. None - заголовок не разобран или
+    диапазонов несколько (отдаётся весь файл); ValueError - диапазон вне файла.
+    """
+    match = RANGE.match(value.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(value)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(value)
+    return start, end
+
+
+class StaticAssets(StaticFiles):
+    """
+    Раздача static поверх StaticFiles:
+
+    * запросы Range (один диапазон) для больших вложений;
+    * предсжатые копии .br/.gz (см. precompress_static.py), если клиент их принимает;
+    * адреса с отпечатком содержимого (static_url) и файлы из хранилища по
+      sha256 (UPLOADS_DIR) отдаются с неизменяемым кэшированием, остальные -
+      с коротким;
+    * индекс лиц и временные файлы загрузок по умолчанию лежат вне static;
+      если FACE_INDEX_DIR или UPLOADS_TMP_DIR настроены внутрь него, эти
+      каталоги не раздаются.
+
+    Полные ответы остаются FileResponse: сервер с расширением
+    http.response.pathsend отдаёт файл сам. Файлы ищутся на диске вне
+    event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        root = self.directory or ""
+        self.private_prefixes = tuple(
+            prefix for prefix in (
+                _prefix_inside(directory, root) for directory in (settings.FACE_INDEX_DIR, settings.UPLOADS_TMP_DIR)
+            )
+            if prefix is not None
+        )
+        uploads = _prefix_inside(settings.UPLOADS_DIR, root)
+        self.immutable_prefixes = (uploads,) if uploads else ()
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        path = path.replace(os.sep, "/").lstrip("/")
+        if self.private_prefixes and path.startswith(self.private_prefixes):
+            raise HTTPException(status_code=404)
+
+        match = FINGERPRINTED.match(path)
+        if match is not None:
+            original = match.group("stem") + match.group("ext")
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, original)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                current = await anyio.to_thread.run_sync(fingerprint, full_path, stat_result)
+                if current != match.group("hash"):
+                    # Старый отпечаток: не кэшировать навсегда чужое содержимое
+                    raise HTTPException(status_code=404)
+                return await self._file_response(full_path, stat_result, scope, immutable=True)
+
+        if scope["method"] in ("GET", "HEAD"):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return await self._file_response(full_path, stat_result, scope)
+        return await super().get_response(path, scope)
+
+    async def _file_response(
+            self,
+            full_path: str,
+            stat_result: os.stat_result,
+            scope: Scope,
+            immutable: bool = False,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        immutable = immutable or (bool(self.immutable_prefixes) and relative.startswith(self.immutable_prefixes))
+        cache_control = settings.IMMUTABLE_CACHE_CONTROL if immutable else settings.STATIC_CACHE_CONTROL
+
+        media_type = guess_type(full_path)[0] or "text/plain"
+        encoded = None
+        if "range" not in request_headers:
+            encoded = await anyio.to_thread.run_sync(
+                self._find_encoded, full_path, request_headers.get("accept-encoding", ""),
+            )
+
+        if encoded is not None:
+            encoding, encoded_path, encoded_stat = encoded
+            response = FileResponse(encoded_path, stat_result=encoded_stat, media_type=media_type)
+            response.headers["content-encoding"] = encoding
+        else:
+            response = FileResponse(full_path, stat_result=stat_result, media_type=media_type)
+        response.headers["accept-ranges"] = "bytes"
+        response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = cache_control
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if encoded is None and range_header and self._if_range_matches(request_headers, response):
+            try:
+                byte_range = _parse_range(range_header, stat_result.st_size)
+            except ValueError:
+                return Response(
+                    status_code=416,
+                    headers={"content-range": f"bytes */{stat_result.st_size}", "accept-ranges": "bytes"},
+                )
+            if byte_range is not None:
+                partial = RangeFileResponse(full_path, *byte_range, stat_result=stat_result, media_type=media_type)
+                for header in ("accept-ranges", "vary", "cache-control", "etag", "last-modified"):
+                    partial.headers[header] = response.headers[header]
+                return partial
+        return response
+
+    @staticmethod
+    def _find_encoded(full_path: str, accept_encoding: str) -> Optional[Tuple[str, str, os.stat_result]]:
+        accepted = {token.split(";")[0].strip().lower() for token in accept_encoding.split(",")}
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                encoded_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if stat.S_ISREG(encoded_stat.st_mode):
+                return encoding, full_path + suffix, encoded_stat
+        return None
+
+    @staticmethod
+    def _if_range_matches(request_headers: Headers, response: Response) -> bool:
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        return if_range in (response.headers.get("etag"), response.headers.get("last-modified"))
+
+    def static_url(self, path: str) -> str:
+        """
+        Адрес файла static с отпечатком содержимого: css/404.css ->
+        /static/css/404.<hash>.css. Такой адрес кэшируется клиентом навсегда.
+        Для фронтенда адреса собираются в манифест (precompress_static.py).
+        """
+        path = path.lstrip("/")
+        full_path = os.path.join(self.directory, path)
+        stem, ext = os.path.splitext(path)
+        return f"{settings.STATIC_URL}/{stem}.{fingerprint(full_path)}{ext}"
+
+
+static_assets = StaticAssets(directory=settings.STATIC_FILES_DIR, check_dir=False)
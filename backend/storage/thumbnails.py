@@ -0,0 +1,132 @@
+import asyncio
+import glob
+import logging
+import os
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+from backend.config import settings
+from backend.storage.uploads import content_path
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_GENERATED = Counter(
+    "thumbnails_generated_total", "Avatar thumbnail sets generated", ["trigger"],
+)
+THUMBNAIL_LATENCY = Histogram(
+    "thumbnail_generation_seconds", "Time to generate all thumbnail variants of one avatar",
+)
+
+# Расширение файла -> формат Pillow
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+AVATAR_KIND = "avatars"
+
+
+def thumbnail_path(sha256: str, size: int, extension: str) -> str:
+    return f"{settings.UPLOADS_DIR}/thumbs/{sha256[:2]}/{sha256}/{size}.{extension}"
+
+
+def thumbnail_url(sha256: str, size: int, extension: str) -> str:
+    return f"/media/thumbs/{sha256}/{size}.{extension}"
+
+
+def thumbnail_urls(sha256: Optional[str]) -> Dict[str, str]:
+    """
+    URL миниатюр аватара: {"64.webp": ..., "64.jpg": ..., ...}.
+    """
+    if not sha256:
+        return {}
+    return {
+        f"{size}.{extension}": thumbnail_url(sha256, size, extension)
+        for size in settings.AVATAR_THUMBNAIL_SIZES
+        for extension in FORMATS
+    }
+
+
+def find_source(sha256: str) -> Optional[str]:
+    """
+    Исходный аватар по sha256 (расширение исходного файла заранее неизвестно).
+    """
+    matches = glob.glob(glob.escape(content_path(AVATAR_KIND, sha256)) + "*")
+    return matches[0] if matches else None
+
+
+def _render(source: str, sha256: str) -> None:
+    """
+    Все варианты миниатюр одного изображения. Выполняется в пуле потоков:
+    декодирование и масштабирование Pillow отпускают GIL.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size in settings.AVATAR_THUMBNAIL_SIZES:
+            variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            for extension, image_format in FORMATS.items():
+                path = thumbnail_path(sha256, size, extension)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                if image_format == "JPEG":
+                    variant.save(tmp_path, image_format, quality=85, optimize=True, progressive=True)
+                else:
+                    variant.save(tmp_path, image_format, quality=80, method=4)
+                os.replace(tmp_path, path)
+
+
+class ThumbnailGenerator:
+    """
+    Генерация миниатюр аватаров вне event loop. Одновременные запросы
+    миниатюр одного аватара ждут одну и ту же задачу.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._running: Dict[str, asyncio.Future] = {}
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnails")
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def generate(self, source: str, sha256: str, trigger: str = "upload") -> None:
+        running = self._running.get(sha256)
+        if running is not None:
+            return await asyncio.shield(running)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        future = loop.run_in_executor(self._ensure_pool(), _render, source, sha256)
+        self._running[sha256] = future
+        # Запись снимается по завершении рендера, а не первого ожидающего:
+        # отменённый запрос не должен открывать дорогу повторной генерации
+        future.add_done_callback(lambda done: self._finished(sha256, trigger, loop.time() - started, done))
+        await asyncio.shield(future)
+
+    def _finished(self, sha256: str, trigger: str, elapsed: float, future: asyncio.Future) -> None:
+        self._running.pop(sha256, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        THUMBNAILS_GENERATED.labels(trigger=trigger).inc()
+        THUMBNAIL_LATENCY.observe(elapsed)
+
+    async def generate_quietly(self, source: str, sha256: str) -> None:
+        """
+        Генерация при загрузке аватара: ошибка не мешает сохранить пользователя,
+        недостающие миниатюры будут созданы при первом запросе.
+        """
+        try:
+            await self.generate(source, sha256)
+        except Exception as e:
+            logger.warning(f"Thumbnails for {sha256} failed: {e}")
+
+
+thumbnail_generator = ThumbnailGenerator(max_workers=settings.THUMBNAIL_WORKERS)
@@ -0,0 +1,123 @@
+import errno
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+from fastapi import HTTPException
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_STORED = Counter("uploads_stored_total", "Uploaded files written to content-addressed storage", ["kind"])
+UPLOADS_DEDUPLICATED = Counter("uploads_deduplicated_total", "Uploads whose content was already stored", ["kind"])
+
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class StoredFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+def _extension(filename: Optional[str]) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if _EXTENSION.match(suffix) else ""
+
+
+def content_path(kind: str, sha256: str, extension: str = "") -> str:
+    """
+    Путь файла по содержимому: {UPLOADS_DIR}/{kind}/ab/cd/<sha256><ext>.
+    Одинаковые файлы получают один путь, имя от клиента не используется.
+    """
+    return f"{settings.UPLOADS_DIR}/{kind}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+async def _move(tmp_path: str, path: str) -> None:
+    """
+    Переносит временный файл в хранилище. Если каталог временных файлов на
+    другой файловой системе (отдельный том), файл сначала копируется рядом с
+    целевым под случайным именем и уже оттуда атомарно переименовывается.
+    """
+    try:
+        await aiofiles.os.replace(tmp_path, path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        staged = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            await run_in_threadpool(shutil.copyfile, tmp_path, staged)
+            await aiofiles.os.replace(staged, path)
+        finally:
+            if await aiofiles.os.path.exists(staged):
+                await aiofiles.os.remove(staged)
+
+
+async def save_upload(
+        file: UploadFile,
+        kind: str,
+        max_size: int,
+        content_types: Tuple[str, ...] = (),
+) -> StoredFile:
+    """
+    Сохраняет загруженный файл потоково: чанки по UPLOAD_CHUNK_SIZE пишутся
+    во временный файл без блокировки event loop, одновременно считается
+    sha256. Файл больше max_size отклоняется (413) до конца чтения.
+
+    Готовый файл переименовывается в путь по содержимому; если такой файл уже
+    есть, временный удаляется, а возвращается существующий путь.
+    content_types - допустимые префиксы Content-Type (например, "image/").
+    """
+    if content_types and not (file.content_type or "").startswith(content_types):
+        raise HTTPException(status_code=415, detail=f"Недопустимый тип файла: {file.content_type}")
+
+    tmp_dir = Path(settings.UPLOADS_TMP_DIR)
+    await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = tmp_dir / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413, detail=f"Файл больше допустимого размера ({max_size} байт)",
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = content_path(kind, sha256, _extension(file.filename))
+        if await aiofiles.os.path.exists(path):
+            UPLOADS_DEDUPLICATED.labels(kind=kind).inc()
+        else:
+            await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Атомарно: параллельная загрузка того же файла перезапишет его тем же содержимым
+            await _move(str(tmp_path), path)
+            UPLOADS_STORED.labels(kind=kind).inc()
+        return StoredFile(path, sha256, size)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка сохранения файла {file.filename!r}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Не удалось сохранить файл")
+    finally:
+        if await aiofiles.os.path.exists(tmp_path):
+            await aiofiles.os.remove(tmp_path)
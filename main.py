@@ -2,50 +2,73 @@ import uvicorn
 
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from redis import asyncio as aioredis
-
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request
 from fastapi.routing import APIRouter
-from fastapi.staticfiles import StaticFiles
 from starlette_exporter import handle_metrics
 from starlette_exporter import PrometheusMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.config.settings import settings, STATIC_FILES_DIR, BASE_DIR
+from backend.cache.backend import init_cache, close_cache
+from backend.config.settings import settings, STATIC_FILES_DIR, STATIC_URL
+from backend.db.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
 from backend.src.account.user.api import user_router
 from backend.src.account.user.admin_privilege import admin_router
 from backend.src.account.user.login_handler import login_router
 from backend.src.account.face.router import router as face_router
+from backend.src.account.face.executor import face_executor
+from backend.src.account.face.utils import start_face_index_build, stop_face_index_build
+from backend.src.account.user.audit import audit_writer
+from backend.src.chat.broker import broker as chat_broker
+from backend.src.chat.websocket import manager as chat_manager
+from backend.src.chat.writer import message_writer
 
 from backend.src.regions.router import router as region_router
 from backend.src.departments.router import router as departments_router
 from backend.src.ekzamens.router import router as ezamens_router
 from backend.src.chat.router import router as chat_router
+from backend.storage.router import router as media_router
+from backend.storage.static import static_assets
+from backend.storage.thumbnails import thumbnail_generator
 
 
 #########################
 # BLOCK WITH API ROUTES #
 #########################
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    await init_cache()
+    await face_executor.start()
+    # Индекс лиц собирается в фоне: до готовности вход по лицу отвечает 503
+    start_face_index_build()
+    audit_writer.start()
+    await chat_broker.start()
+    message_writer.start()
+    yield
+    await chat_manager.close_all()
+    # Дописываем принятые сообщения до остановки брокера: он разошлёт их по комнатам
+    await message_writer.stop()
+    await chat_broker.stop()
+    await audit_writer.stop()
+    await stop_face_index_build()
+    face_executor.shutdown()
+    thumbnail_generator.shutdown()
+    await close_cache()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    version=settings.PROJECT_VERSION
+    version=settings.PROJECT_VERSION,
+    lifespan=lifespan,
 )
 
 static_dir = STATIC_FILES_DIR
 if not static_dir.exists():
     static_dir.mkdir(parents=True)
 app.mount(
-    "/static",
-    StaticFiles(directory=BASE_DIR / "static"),
-    name="static",
-)
-app.mount(
-    "/static",
-    StaticFiles(directory=static_dir),
+    STATIC_URL,
+    static_assets,
     name="static",
 )
 
@@ -59,6 +82,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, "ETag"],
 )
 
 app.add_middleware(PrometheusMiddleware)
@@ -68,8 +92,8 @@ main_api_router = APIRouter()
 
 
 @main_api_router.get("/")
-async def ping():
-    return FileResponse("static/404/404.jpg")
+async def ping(request: Request):
+    return await static_assets.get_response("404/404.jpg", request.scope)
 
 main_api_router.include_router(
     chat_router,
@@ -77,6 +101,12 @@ main_api_router.include_router(
     tags=["CHAT"]
 )
 
+main_api_router.include_router(
+    media_router,
+    prefix="/media",
+    tags=["MEDIA"]
+)
+
 main_api_router.include_router(
     region_router,
     prefix="/regions",
@@ -124,12 +154,6 @@ main_api_router.include_router(
 app.include_router(main_api_router)
 
 
-@asynccontextmanager
-async def lifespan(_: FastAPI) -> AsyncIterator[None]:
-    redis = aioredis.from_url("redis://localhost")
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
-    yield
-
 if __name__ == "__main__":
     # run app on the host and port
     uvicorn.run(app, host="127.0.0.1", port=8001)
@@ -0,0 +1,139 @@
+"""
+Предсжатие статики: рядом с каждым файлом пишутся копии .gz и .br, которые
+StaticAssets отдаёт клиентам с Accept-Encoding. Копия не пишется, если она
+не меньше исходного файла, и пересоздаётся, только если исходник новее.
+
+Заодно пишется манифест (по умолчанию static/manifest.json): путь файла ->
+адрес с отпечатком содержимого (StaticAssets.static_url), например
+"css/404.css" -> "/static/css/404.1a2b3c4d.css". Фронтенд берёт адреса из
+манифеста, и браузер кэширует такие файлы навсегда.
+
+    python precompress_static.py                # static/css
+    python precompress_static.py css 404 --min-size 512
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import uuid
+
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.storage.static import static_assets
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("precompress_static")
+
+EXTENSIONS = (".css", ".js", ".html", ".svg", ".json", ".txt", ".xml", ".map")
+# Служебные файлы рядом с ассетами: в манифест не попадают
+SKIPPED_SUFFIXES = (".gz", ".br", ".tmp")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _write_if_smaller(path: str, data: bytes, original_size: int) -> bool:
+    if len(data) >= original_size:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _is_fresh(source: str, compressed: str) -> bool:
+    return os.path.exists(compressed) and os.path.getmtime(compressed) >= os.path.getmtime(source)
+
+
+def compress_file(path: str, brotli=None, force: bool = False) -> Tuple[bool, bool]:
+    """
+    Возвращает (записан .gz, записан .br).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    wrote_gzip = wrote_brotli = False
+    if force or not _is_fresh(path, path + ".gz"):
+        # mtime=0 - одинаковое содержимое даёт одинаковый .gz (и ETag)
+        wrote_gzip = _write_if_smaller(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0), len(data))
+    if brotli is not None and (force or not _is_fresh(path, path + ".br")):
+        wrote_brotli = _write_if_smaller(path + ".br", brotli.compress(data, quality=11), len(data))
+    return wrote_gzip, wrote_brotli
+
+
+def precompress(directory: str, min_size: int, force: bool = False, brotli=None) -> Tuple[int, int]:
+    gzipped = brotlied = 0
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith(EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            wrote_gzip, wrote_brotli = compress_file(path, brotli, force)
+            gzipped += wrote_gzip
+            brotlied += wrote_brotli
+    return gzipped, brotlied
+
+
+def build_manifest(directories: List[str]) -> Dict[str, str]:
+    manifest = {}
+    for directory in directories:
+        for root, _, files in os.walk(os.path.join(settings.STATIC_FILES_DIR, directory)):
+            for name in sorted(files):
+                if name.endswith(SKIPPED_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, settings.STATIC_FILES_DIR).replace(os.sep, "/")
+                manifest[relative] = static_assets.static_url(relative)
+    return manifest
+
+
+def write_manifest(path: str, manifest: Dict[str, str]) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write .gz/.br copies of static text assets")
+    parser.add_argument("dirs", nargs="*", default=["css"], help="directories inside STATIC_FILES_DIR")
+    parser.add_argument("--min-size", type=int, default=256, help="skip files smaller than this many bytes")
+    parser.add_argument("--force", action="store_true", help="recompress files that look up to date")
+    parser.add_argument(
+        "--manifest", default=os.path.join(settings.STATIC_FILES_DIR, "manifest.json"),
+        help="where to write the path -> fingerprinted URL manifest ('' to skip)",
+    )
+    args = parser.parse_args(argv)
+
+    brotli = _brotli()
+    if brotli is None:
+        logger.warning("brotli is not installed, writing .gz only")
+    for directory in args.dirs:
+        path = os.path.join(settings.STATIC_FILES_DIR, directory)
+        if not os.path.isdir(path):
+            logger.warning("%s is not a directory, skipped", path)
+            continue
+        gzipped, brotlied = precompress(path, args.min_size, args.force, brotli)
+        logger.info("%s: %d .gz, %d .br written", path, gzipped, brotlied)
+
+    if args.manifest:
+        directories = [directory for directory in args.dirs
+                       if os.path.isdir(os.path.join(settings.STATIC_FILES_DIR, directory))]
+        manifest = build_manifest(directories)
+        write_manifest(args.manifest, manifest)
+        logger.info("%s: %d fingerprinted URLs", args.manifest, len(manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Полный пересчёт статистики экзамена (exam_question_stats, exam_answer_stats,
+exam_category_stats) по сохранённым результатам.
+
+Обычно статистика обновляется при каждой оценке билета; пересчёт нужен после
+миграции, ручной правки результатов или изменения формул.
+
+    python recompute_exam_stats.py
+"""
+import asyncio
+import logging
+import time
+
+from backend.db.session import async_engine, async_session_factory
+from backend.src.ekzamens.stats import recompute_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("recompute_exam_stats")
+
+
+async def main() -> None:
+    started = time.perf_counter()
+    async with async_session_factory() as session:
+        summary = await recompute_stats(session)
+    await async_engine.dispose()
+    logger.info("Recomputed in %.1fs: %s", time.perf_counter() - started, summary)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
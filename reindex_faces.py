@@ -0,0 +1,112 @@
+"""
+Пакетная (пере)индексация лиц по аватарам пользователей.
+
+Эмбеддинги считаются пачками в нескольких процессах, результат записывается
+в FACE_INDEX_DIR новой версией (embeddings.npy - float32, ids.npy - user_id) и
+публикуется атомарной заменой файла CURRENT; воркеры приложения открывают
+новую версию через mmap при следующем входе по лицу.
+
+    python reindex_faces.py --workers 4 --batch-size 32 --report face-report.csv
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import multiprocessing
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple
+
+from sqlalchemy import select
+
+from backend.config import settings
+from backend.db.session import async_engine, async_session_factory
+from backend.src.account.face import inference
+from backend.src.account.face.index import FaceIndex
+from backend.src.account.user.models import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("reindex_faces")
+
+
+async def _load_avatars(include_inactive: bool) -> List[Tuple[str, str]]:
+    query = select(User.user_id, User.avatar).where(User.avatar.isnot(None))
+    if not include_inactive:
+        query = query.where(User.is_active == True)
+    async with async_session_factory() as session:
+        result = await session.execute(query)
+        avatars = [(str(user_id), avatar) for user_id, avatar in result.all()]
+    await async_engine.dispose()
+    return avatars
+
+
+def reindex(
+        avatars: List[Tuple[str, str]],
+        output: str,
+        workers: int,
+        batch_size: int,
+) -> Tuple[int, List[Tuple[str, str, str]]]:
+    """
+    Строит новый индекс и атомарно публикует его в output.
+    Возвращает число проиндексированных пользователей и список ошибок
+    (user_id, путь к аватару, причина).
+    """
+    index = FaceIndex(output)
+    failures = []
+    batches = [avatars[start:start + batch_size] for start in range(0, len(avatars), batch_size)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=inference.warm_up,
+        initargs=(settings.FACE_MODEL_NAME,),
+    ) as pool:
+        futures = {
+            pool.submit(inference.embed_image_files, [avatar for _, avatar in batch], settings.FACE_MODEL_NAME): batch
+            for batch in batches
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            batch = futures[future]
+            try:
+                embedded = future.result()
+            except Exception as e:
+                # Упал процесс пула или передача результата - пачка целиком в отчёт
+                logger.error("Batch %d/%d failed: %s", done, len(batches), e)
+                embedded = [(None, f"{inference.UNREADABLE}: {type(e).__name__}: {e}")] * len(batch)
+            for (user_id, avatar), (embedding, error) in zip(batch, embedded):
+                if embedding is None:
+                    failures.append((user_id, avatar, error))
+                else:
+                    index.upsert(user_id, embedding)
+            logger.info("Batch %d/%d done", done, len(batches))
+    index.save(merge=False)
+    return len(index), failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the face embedding index from user avatars")
+    parser.add_argument("--workers", type=int, default=max(1, multiprocessing.cpu_count() - 1))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=settings.FACE_INDEX_DIR)
+    parser.add_argument("--include-inactive", action="store_true")
+    parser.add_argument("--report", help="CSV file for avatars that could not be indexed")
+    args = parser.parse_args()
+
+    avatars = asyncio.run(_load_avatars(args.include_inactive))
+    logger.info("Indexing %d avatars with %d workers", len(avatars), args.workers)
+
+    started = time.perf_counter()
+    indexed, failures = reindex(avatars, args.output, args.workers, args.batch_size)
+    logger.info("Indexed %d users in %.1fs, %d failed", indexed, time.perf_counter() - started, len(failures))
+
+    for user_id, avatar, error in failures:
+        logger.warning("%s: %s (%s)", user_id, avatar, error)
+    if args.report:
+        with open(args.report, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["user_id", "avatar", "error"])
+            writer.writerows(failures)
+
+
+if __name__ == "__main__":
+    main()